@@ -0,0 +1,189 @@
+"""
+Offline stand-ins for Gemini, arXiv, PDF downloads (an httpx mock transport)
+and docling, plus an in-process MCP server fixture, so the chatbot and
+research server can be benchmarked without network access or API keys.
+
+Everything is deterministic: the same query always yields the same papers,
+PDFs and model responses, so runs are comparable against a saved baseline.
+"""
+import asyncio
+import random
+import time
+import zlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+from google.genai import types
+from mcp.shared.memory import create_connected_server_and_client_session
+
+WORDS = (
+    "model training attention diffusion graph network transformer dataset benchmark "
+    "optimization gradient inference latency robust sparse retrieval language vision "
+    "reinforcement policy reward embedding contrastive protein molecule quantum"
+).split()
+
+# A planner maps a user query to the function calls the fake model should make.
+Planner = Callable[[str], List[Tuple[str, Dict]]]
+
+
+def _rng(seed_text: str) -> random.Random:
+    return random.Random(zlib.crc32(seed_text.encode("utf-8")))
+
+
+def lorem(seed_text: str, words: int) -> str:
+    rng = _rng(seed_text)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+class FakeGeminiClient:
+    """
+    Replacement for `genai.Client` covering what the chatbot uses:
+    `aio.models.generate_content_stream` and `aio.models.generate_content`.
+
+    A turn that ends with a user question is answered with the function
+    calls returned by `planner` (or plain text if it returns none); a turn
+    that ends with function responses is answered with text. `first_token`
+    and `chunk_interval` (seconds) simulate model latency.
+    """
+
+    def __init__(self, planner: Planner = lambda query: [], first_token: float = 0.0,
+                 chunk_interval: float = 0.0, answer_words: int = 120):
+        self.planner = planner
+        self.first_token = first_token
+        self.chunk_interval = chunk_interval
+        self.answer_words = answer_words
+        self.requests = 0
+        self.aio = SimpleNamespace(models=SimpleNamespace(
+            generate_content_stream=self._generate_content_stream,
+            generate_content=self._generate_content,
+        ))
+
+    @staticmethod
+    def _chunk(part: types.Part) -> types.GenerateContentResponse:
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))]
+        )
+
+    async def _generate_content_stream(self, model, contents, config=None):
+        self.requests += 1
+        last = contents[-1]
+        question = next((part.text for part in last.parts or [] if part.text), None)
+        calls = self.planner(question) if last.role == "user" and question else []
+        if calls:
+            parts = [types.Part(function_call=types.FunctionCall(name=name, args=args)) for name, args in calls]
+        else:
+            text = lorem(f"{len(contents)}:{question}", self.answer_words)
+            parts = [types.Part(text=text[i:i + 200]) for i in range(0, len(text), 200)]
+
+        async def stream():
+            await asyncio.sleep(self.first_token)
+            for i, part in enumerate(parts):
+                if i:
+                    await asyncio.sleep(self.chunk_interval)
+                yield self._chunk(part)
+
+        return stream()
+
+    async def _generate_content(self, model, contents, config=None):
+        self.requests += 1
+        await asyncio.sleep(self.first_token)
+        return SimpleNamespace(text="- " + lorem(str(contents)[:200], 40))
+
+
+class FakeArxivClient:
+    """Replacement for `arxiv.Client`: `results(search)` yields `search.max_results` synthetic papers."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    @staticmethod
+    def paper_id(query: str, rank: int) -> str:
+        # Rank 0 is the most recently published, so it is what search_papers keeps first.
+        return f"{zlib.crc32(query.encode('utf-8')) % 9000 + 1000}.{rank:05d}v1"
+
+    def results(self, search):
+        if self.delay:
+            time.sleep(self.delay)
+        published = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for rank in range(search.max_results):
+            short_id = self.paper_id(search.query, rank)
+            yield SimpleNamespace(
+                get_short_id=lambda short_id=short_id: short_id,
+                title=f"{search.query.title()}: {lorem(short_id, 6)}",
+                authors=[SimpleNamespace(name=f"Author {short_id}-{i}") for i in range(3)],
+                summary=lorem(f"summary {short_id} {search.query}", 180),
+                pdf_url=f"https://arxiv.org/pdf/{short_id}",
+                published=published - timedelta(days=rank),
+            )
+
+
+def fake_pdf_bytes(pdf_url: str, size: int = 200_000) -> bytes:
+    """Deterministic PDF-like bytes for a URL."""
+    sentence = (lorem(pdf_url, 200) + ". ").encode("utf-8")
+    return b"%PDF-1.7\n" + (sentence * (size // len(sentence) + 1))[:size]
+
+
+def fake_pdf_handler(request: httpx.Request) -> httpx.Response:
+    """httpx MockTransport handler serving `fake_pdf_bytes`, including Range requests."""
+    body = fake_pdf_bytes(str(request.url))
+    range_header = request.headers.get("Range")
+    if range_header:
+        start = int(range_header.split("=")[1].split("-")[0])
+        if start >= len(body):
+            return httpx.Response(416)
+        return httpx.Response(206, content=body[start:])
+    return httpx.Response(200, content=body)
+
+
+class FakeDocumentConverter:
+    """Replacement for docling's `DocumentConverter`: Markdown sections sized from the input bytes."""
+
+    def __init__(self, seconds_per_mb: float = 0.0):
+        self.seconds_per_mb = seconds_per_mb
+
+    def convert(self, source):
+        data = Path(source).read_bytes()
+        if self.seconds_per_mb:
+            time.sleep(self.seconds_per_mb * len(data) / 1_000_000)
+        text = data[9:].decode("utf-8", errors="ignore")
+        sections = ["Abstract", "Introduction", "Methods", "Results", "Discussion", "References"]
+        step = max(1, len(text) // len(sections))
+        markdown = "\n\n".join(
+            f"## {name}\n\n{text[i * step:(i + 1) * step]}" for i, name in enumerate(sections)
+        )
+        return SimpleNamespace(document=SimpleNamespace(export_to_markdown=lambda: markdown))
+
+
+def install_research_fakes(research_server, arxiv_delay: float = 0.0, convert_seconds_per_mb: float = 0.0):
+    """
+    Point an imported `research_server` module at the fakes above. PDFs go
+    through the real PdfStore, with only its HTTP transport replaced.
+    """
+    import parse_worker
+    from pdf_store import PdfStore
+
+    research_server._arxiv_client = FakeArxivClient(arxiv_delay)
+    research_server._pdf_store = PdfStore(
+        research_server.PDF_STORE_DIR,
+        max_parallel=research_server.PDF_DOWNLOAD_WORKERS,
+        client=httpx.Client(transport=httpx.MockTransport(fake_pdf_handler)),
+    )
+    parse_worker._converter = FakeDocumentConverter(convert_seconds_per_mb)
+
+
+@asynccontextmanager
+async def in_process_session(fastmcp_server):
+    """An initialized MCP ClientSession talking to `fastmcp_server` over in-memory streams."""
+    async with create_connected_server_and_client_session(fastmcp_server._mcp_server) as session:
+        yield session
+
+
+async def attach_session(bot, name: str, session) -> None:
+    """Register an already-connected session with a `GeminiMCPChatBot`, as startup would."""
+    discovery = await bot._discover_server(name, session)
+    declarations = bot._register_server(name, session, discovery)
+    bot.tool_config = types.Tool(function_declarations=declarations)
@@ -0,0 +1,93 @@
+"""
+Startup budget check for research_server.py.
+
+Imports the module in fresh interpreters and fails (exit status 1) if the
+median import takes longer than the budget, or if any dependency that is
+supposed to be loaded lazily (docling, arxiv, numpy, torch) was imported.
+The slowest imports of the last run are listed to show where time went.
+
+    uv run benchmarks/import_time.py --budget-ms 1000
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+# Top-level packages research_server must not import at module load.
+LAZY_MODULES = ("docling", "arxiv", "numpy", "torch", "vector_store")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import research_server
+elapsed = time.perf_counter() - started
+loaded = sorted({name.split(".")[0] for name in sys.modules} & set(sys.argv[1:]))
+print(json.dumps({"seconds": elapsed, "loaded": loaded}))
+"""
+
+
+def probe(importtime: bool = False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE, *LAZY_MODULES]
+    result = subprocess.run(command, cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_imports(importtime_log: str, count: int):
+    """Direct imports of research_server by cumulative time, from a `-X importtime` log."""
+    # Lines look like "import time: self [us] | cumulative | <indent>package"; the indent
+    # grows by two spaces per nesting level and children are listed before their parent.
+    children = []
+    for line in importtime_log.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            children.append((int(parts[1]), name.strip()))
+        elif depth == 0:
+            if name.strip() == "research_server":
+                return sorted(children, reverse=True)[:count]
+            children = []
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    timings = []
+    loaded = set()
+    for _ in range(args.runs):
+        result, _ = probe()
+        timings.append(result["seconds"] * 1000)
+        loaded.update(result["loaded"])
+    _, importtime_log = probe(importtime=True)
+
+    median = statistics.median(timings)
+    print(f"import research_server: median {median:.0f} ms, max {max(timings):.0f} ms over {args.runs} runs "
+          f"(budget {args.budget_ms:.0f} ms)")
+    print("\nslowest direct imports (cumulative):")
+    for cumulative, name in slowest_imports(importtime_log, args.top):
+        print(f"   {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if loaded:
+        print(f"\n❌ loaded at import time but should be lazy: {', '.join(sorted(loaded))}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"\n❌ import time over budget by {median - args.budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\n✅ within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Offline end-to-end benchmark of the research server and the chatbot.
+
+Gemini, arXiv, PDF downloads and docling are replaced by the deterministic
+fakes in `benchmarks/fakes.py`, and the research server runs in-process
+behind a real MCP ClientSession over in-memory streams, so the run measures
+this repository's code (MCP round trips, storage, indexing, history
+handling) rather than the network. Everything runs in a temporary
+directory.
+
+Workloads:
+  research  many topics: search_papers, extract_info, file_parsing,
+            search_paper_text, semantic_search_papers and the topic resource
+  chat      scripted multi-turn conversations through
+            GeminiMCPChatBot.process_query
+
+Reports p50/p95 latency per operation, throughput and peak traced memory
+per workload, and compares against a saved baseline:
+
+    uv run benchmarks/offline.py --save-baseline   # record benchmarks/baseline.json
+    uv run benchmarks/offline.py                   # compare; exits 1 on regression
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fakes import FakeArxivClient, FakeGeminiClient, attach_session, in_process_session, install_research_fakes  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+
+    @contextlib.contextmanager
+    def time(self, op: str):
+        started = time.perf_counter()
+        yield
+        self.latencies.setdefault(op, []).append(time.perf_counter() - started)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def topics_for(count):
+    return [f"benchmark topic {i} graph attention" for i in range(count)]
+
+
+async def research_workload(session, recorder, args):
+    for topic in topics_for(args.topics):
+        with recorder.time("search_papers"):
+            result = await session.call_tool(
+                "search_papers", {"topic": topic, "max_results": args.papers_per_topic, "search_pool_size": 50}
+            )
+        paper_ids = re.findall(r"Paper ID: (\S+)", result.content[0].text)
+        for paper_id in paper_ids:
+            with recorder.time("extract_info"):
+                await session.call_tool("extract_info", {"paper_id": paper_id})
+        with recorder.time("file_parsing"):
+            await session.call_tool("file_parsing", {"paper_id": paper_ids[0]})
+        with recorder.time("search_paper_text"):
+            await session.call_tool("search_paper_text", {"query": topic})
+        with recorder.time("semantic_search_papers"):
+            await session.call_tool("semantic_search_papers", {"query": topic})
+        with recorder.time("read_topic_resource"):
+            await session.read_resource(f"papers://{topic.replace(' ', '_')}")
+
+
+def chat_planner(query):
+    # "search <topic>" / "info <topic>" / "parse <topic>"; the paper IDs are the
+    # ones FakeArxivClient gives the topic's newest papers.
+    verb, topic = query.split(" ", 1)
+    if verb == "search":
+        return [("search_papers", {"topic": topic, "max_results": 3})]
+    if verb == "info":
+        return [("extract_info", {"paper_id": FakeArxivClient.paper_id(topic, rank)}) for rank in range(3)]
+    if verb == "parse":
+        return [("file_parsing", {"paper_id": FakeArxivClient.paper_id(topic, 0)})]
+    return []
+
+
+async def chat_workload(session, recorder, args):
+    import mcp_chatbot_gemini
+
+    fake_client = FakeGeminiClient(chat_planner, first_token=args.model_latency)
+    mcp_chatbot_gemini.genai = SimpleNamespace(Client=lambda **kwargs: fake_client)
+    bot = mcp_chatbot_gemini.GeminiMCPChatBot()
+    await attach_session(bot, "research", session)
+
+    for topic in topics_for(args.conversations):
+        bot.messages = []
+        for turn in range(args.turns):
+            query = f"{('search', 'info', 'parse', 'chat')[min(turn, 3)]} {topic}"
+            with recorder.time("process_query"):
+                await bot.process_query(query)
+
+
+WORKLOADS = {"research": research_workload, "chat": chat_workload}
+
+
+async def run(args):
+    import research_server
+
+    install_research_fakes(research_server)
+    # FastMCP logs every request; that would be most of what we measure.
+    logging.disable(logging.INFO)
+    report = {}
+    async with in_process_session(research_server.mcp) as session:
+        for name in args.workloads:
+            recorder = Recorder()
+            if not args.no_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                await WORKLOADS[name](session, recorder, args)
+            wall = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+            tracemalloc.stop()
+
+            ops = sum(len(values) for values in recorder.latencies.values())
+            report[name] = {
+                "wall_seconds": wall,
+                "throughput": ops / wall,
+                "peak_mb": peak / 1024 / 1024,
+                "ops": {
+                    op: {"n": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95)}
+                    for op, values in recorder.latencies.items()
+                },
+            }
+    return report
+
+
+def print_report(report, baseline, tolerance):
+    def compare(current, previous, higher_is_better=False):
+        if not previous:
+            return ""
+        change = (current - previous) / previous
+        worse = -change if higher_is_better else change
+        flag = " ⚠️" if worse > tolerance else ""
+        return f" ({change:+.0%} vs baseline){flag}"
+
+    regressions = 0
+    for name, result in report.items():
+        previous = (baseline or {}).get(name, {})
+        print(f"\n{name}: {result['wall_seconds']:.2f}s wall")
+        line = compare(result["throughput"], previous.get("throughput"), higher_is_better=True)
+        print(f"   throughput: {result['throughput']:.1f} ops/s{line}")
+        regressions += "⚠️" in line
+        if result["peak_mb"]:
+            line = compare(result["peak_mb"], previous.get("peak_mb"))
+            print(f"   peak traced memory: {result['peak_mb']:.1f} MB{line}")
+            regressions += "⚠️" in line
+        for op, stats in result["ops"].items():
+            before = previous.get("ops", {}).get(op, {})
+            p50 = compare(stats["p50"], before.get("p50"))
+            p95 = compare(stats["p95"], before.get("p95"))
+            print(f"   {op} (n={stats['n']}): p50 {stats['p50'] * 1000:.2f} ms{p50}, p95 {stats['p95'] * 1000:.2f} ms{p95}")
+            regressions += ("⚠️" in p50) + ("⚠️" in p95)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", nargs="+", choices=list(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--papers-per-topic", type=int, default=5)
+    parser.add_argument("--conversations", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--model-latency", type=float, default=0.0, help="simulated seconds to first token")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (lower overhead, no peak memory)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before flagging")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        report = asyncio.run(run(args))
+        os.chdir(REPO_DIR)
+
+    regressions = print_report(report, baseline, args.tolerance)
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n💾 Baseline saved to {args.baseline}")
+    elif baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one.")
+    elif regressions:
+        print(f"\n❌ {regressions} metric(s) regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
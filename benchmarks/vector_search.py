@@ -0,0 +1,63 @@
+"""
+Query latency of VectorStore at scale.
+
+Fills a temporary store with random unit vectors (the embedder is bypassed
+for the bulk load so the run measures search, not hashing) and times
+queries through the real `VectorStore.search` path.
+
+    uv run benchmarks/vector_search.py --chunks 100000
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from vector_store import HashingEmbedder, VectorStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--chunks-per-paper", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    embedder = HashingEmbedder(args.dim)
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        bulk = {"vectors": None}
+        store = VectorStore(store_dir, embed=lambda texts: bulk["vectors"], dim=args.dim)
+
+        started = time.perf_counter()
+        for paper in range(0, args.chunks, args.chunks_per_paper):
+            count = min(args.chunks_per_paper, args.chunks - paper)
+            bulk["vectors"] = rng.standard_normal((count, args.dim), dtype=np.float32)
+            store.add(f"paper-{paper}", "parsed", f"Paper {paper}", [f"chunk {i}" for i in range(count)])
+        load_seconds = time.perf_counter() - started
+
+        store.embed = embedder
+        store.search("warm up the memory map", args.limit)
+
+        latencies = []
+        for i in range(args.queries):
+            started = time.perf_counter()
+            store.search(f"query {i} about diffusion models and attention", args.limit)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"chunks: {args.chunks}  dim: {args.dim}  load: {load_seconds:.1f}s")
+    print(f"query latency over {args.queries} queries: "
+          f"p50 {statistics.median(latencies):.2f} ms, p95 {p95:.2f} ms, max {latencies[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
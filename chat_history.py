@@ -0,0 +1,176 @@
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from google.genai import types
+
+# Rough chars-per-token ratio for English text and JSON; good enough for budgeting.
+CHARS_PER_TOKEN = 4
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+
+
+def _to_jsonable(obj: Any) -> Any:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json", exclude_none=True)
+    return str(obj)
+
+
+def content_size(content: types.Content) -> int:
+    """Approximate size in bytes of a Content as it is sent to Gemini."""
+    return len(json.dumps(_to_jsonable(content), default=_to_jsonable, ensure_ascii=False).encode("utf-8"))
+
+
+def _is_user_text(content: types.Content) -> bool:
+    return content.role == "user" and any(part.text for part in content.parts or [])
+
+
+class HistoryManager:
+    """
+    Keeps the conversation sent to Gemini within a token budget.
+
+    Messages are grouped into exchanges, each starting at a user text message
+    and running until the next one. Compaction only ever drops whole
+    exchanges, so a model function call is never separated from its
+    function response.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 32000,
+        max_response_chars: int = 20000,
+        max_old_response_chars: int = 1500,
+        summarizer: Optional[Callable[[str], Awaitable[str]]] = None,
+    ):
+        self.token_budget = token_budget
+        self.max_response_chars = max_response_chars
+        self.max_old_response_chars = max_old_response_chars
+        self.summarizer = summarizer
+        self.requests: List[Dict[str, int]] = []
+        self._pending_compaction: Optional[Dict[str, int]] = None
+
+    def estimate_tokens(self, messages: List[types.Content]) -> int:
+        return sum(content_size(m) for m in messages) // CHARS_PER_TOKEN
+
+    def _truncate_part(self, part: types.Part, limit: int) -> types.Part:
+        response = part.function_response
+        if response is None or not response.response or response.response.get("truncated"):
+            return part
+        text = json.dumps(response.response, default=_to_jsonable, ensure_ascii=False)
+        if len(text) <= limit:
+            return part
+        return types.Part(function_response=types.FunctionResponse(
+            name=response.name,
+            response={
+                "truncated": True,
+                "original_chars": len(text),
+                "content": text[:limit] + " …[truncated]",
+            }
+        ))
+
+    def _truncate(self, content: types.Content, limit: int) -> types.Content:
+        parts = content.parts or []
+        if not any(part.function_response for part in parts):
+            return content
+        return types.Content(role=content.role, parts=[self._truncate_part(part, limit) for part in parts])
+
+    def _split_exchanges(self, messages: List[types.Content]) -> List[List[types.Content]]:
+        exchanges = []
+        for message in messages:
+            if _is_user_text(message) or not exchanges:
+                exchanges.append([])
+            exchanges[-1].append(message)
+        return exchanges
+
+    def _describe(self, exchanges: List[List[types.Content]]) -> str:
+        lines = []
+        for exchange in exchanges:
+            for message in exchange:
+                for part in message.parts or []:
+                    if part.text and part.text.startswith(SUMMARY_PREFIX):
+                        lines.append(part.text[len(SUMMARY_PREFIX):].strip())
+                    elif part.text:
+                        speaker = "User" if message.role == "user" else "Assistant"
+                        lines.append(f"{speaker}: {part.text.strip()[:300]}")
+                    elif part.function_call:
+                        args = json.dumps(part.function_call.args or {}, default=str)
+                        lines.append(f"Tool call: {part.function_call.name}({args[:200]})")
+        return "\n".join(lines)
+
+    async def _summarize(self, exchanges: List[List[types.Content]]) -> str:
+        transcript = self._describe(exchanges)
+        if self.summarizer is not None:
+            try:
+                summary = await self.summarizer(transcript)
+                if summary:
+                    return summary.strip()
+            except Exception as e:
+                print(f"⚠️ History summarization failed, keeping an excerpt instead: {e}")
+        return transcript[:self.max_old_response_chars * 2]
+
+    async def compact(self, messages: List[types.Content]) -> List[types.Content]:
+        """
+        Return a copy of `messages` that fits the token budget. Function
+        responses in the current exchange are capped at `max_response_chars`.
+        Old exchanges are left intact while the history fits; once it doesn't,
+        their function responses are truncated, largest first, and if that is
+        not enough the oldest exchanges are replaced by a single summary
+        exchange.
+        """
+        if not messages:
+            return messages
+        before = sum(content_size(m) for m in messages)
+
+        exchanges = self._split_exchanges(messages)
+        current = [self._truncate(m, self.max_response_chars) for m in exchanges[-1]]
+        old = [list(exchange) for exchange in exchanges[:-1]]
+
+        total_tokens = self.estimate_tokens([m for exchange in old for m in exchange]) + self.estimate_tokens(current)
+        if total_tokens > self.token_budget:
+            responses = sorted(
+                (
+                    (content_size(message), i, j)
+                    for i, exchange in enumerate(old)
+                    for j, message in enumerate(exchange)
+                    if any(part.function_response for part in message.parts or [])
+                ),
+                reverse=True,
+            )
+            for size, i, j in responses:
+                if total_tokens <= self.token_budget:
+                    break
+                old[i][j] = self._truncate(old[i][j], self.max_old_response_chars)
+                total_tokens -= (size - content_size(old[i][j])) // CHARS_PER_TOKEN
+
+        old_tokens = [self.estimate_tokens(exchange) for exchange in old]
+        total_tokens = sum(old_tokens) + self.estimate_tokens(current)
+
+        dropped = []
+        while old and total_tokens > self.token_budget:
+            dropped.append(old.pop(0))
+            total_tokens -= old_tokens.pop(0)
+
+        if dropped:
+            summary = await self._summarize(dropped)
+            old.insert(0, [
+                types.Content(role="user", parts=[types.Part(text=f"{SUMMARY_PREFIX}\n{summary}")]),
+                types.Content(role="model", parts=[types.Part(text="Understood, I'll keep that context in mind.")]),
+            ])
+
+        compacted = [m for exchange in old for m in exchange] + current
+        after = sum(content_size(m) for m in compacted)
+        if after < before:
+            self._pending_compaction = {"before_bytes": before, "dropped_exchanges": len(dropped)}
+        return compacted
+
+    def record_request(self, messages: List[types.Content]) -> Dict[str, int]:
+        """Log the size of a request payload so history savings can be measured."""
+        size = sum(content_size(m) for m in messages)
+        entry = {
+            "messages": len(messages),
+            "bytes": size,
+            "est_tokens": size // CHARS_PER_TOKEN,
+        }
+        if self._pending_compaction:
+            entry.update(self._pending_compaction)
+            self._pending_compaction = None
+        self.requests.append(entry)
+        return entry
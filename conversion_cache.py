@@ -0,0 +1,124 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+
+class ConversionCache:
+    """
+    Persistent cache of PDF -> markdown conversions.
+
+    Markdown is stored once per PDF content hash under `<cache_dir>/<hash>.md`;
+    a SQLite table maps paper IDs to those hashes and tracks sizes and last
+    access times so the least recently used entries can be evicted once the
+    cache grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_dir / "cache.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversions (
+                paper_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _path(self, content_hash: str) -> Path:
+        return self.cache_dir / f"{content_hash}.md"
+
+    def _read(self, content_hash: str) -> Optional[str]:
+        try:
+            return self._path(content_hash).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def get(self, paper_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM conversions WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            markdown = self._read(row[0])
+            if markdown is None:
+                # The file was removed behind our back; forget the entry.
+                self._conn.execute("DELETE FROM conversions WHERE paper_id = ?", (paper_id,))
+            else:
+                self._conn.execute(
+                    "UPDATE conversions SET last_access = ? WHERE paper_id = ?", (time.time(), paper_id)
+                )
+            self._conn.commit()
+        return markdown
+
+    def paper_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT paper_id FROM conversions")]
+
+    def get_by_hash(self, content_hash: str) -> Optional[str]:
+        """Look up a conversion by PDF content, e.g. the same PDF under another paper ID."""
+        return self._read(content_hash)
+
+    def put(self, paper_id: str, content_hash: str, markdown: str) -> None:
+        path = self._path(content_hash)
+        if not path.exists():
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(markdown, encoding="utf-8")
+            tmp_path.replace(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversions (paper_id, content_hash, size, last_access) VALUES (?, ?, ?, ?)",
+                (paper_id, content_hash, path.stat().st_size, time.time()),
+            )
+            self._conn.commit()
+            self._evict()
+
+    def invalidate(self, paper_id: Optional[str] = None) -> int:
+        """Drop one paper's entry, or every entry when `paper_id` is None. Returns the number removed."""
+        with self._lock:
+            if paper_id is None:
+                rows = self._conn.execute("SELECT paper_id, content_hash FROM conversions").fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT paper_id, content_hash FROM conversions WHERE paper_id = ?", (paper_id,)
+                ).fetchall()
+            for row_paper_id, content_hash in rows:
+                self._remove(row_paper_id, content_hash)
+            self._conn.commit()
+        return len(rows)
+
+    def _remove(self, paper_id: str, content_hash: str) -> None:
+        self._conn.execute("DELETE FROM conversions WHERE paper_id = ?", (paper_id,))
+        still_used = self._conn.execute(
+            "SELECT 1 FROM conversions WHERE content_hash = ? LIMIT 1", (content_hash,)
+        ).fetchone()
+        if not still_used:
+            self._path(content_hash).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        # Sizes are counted once per stored file, not once per paper ID.
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT content_hash, size FROM conversions)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT paper_id, content_hash, size FROM conversions ORDER BY last_access"
+        ).fetchall()
+        for paper_id, content_hash, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._remove(paper_id, content_hash)
+            if not self._path(content_hash).exists():
+                total -= size
+        self._conn.commit()
@@ -0,0 +1,123 @@
+import hashlib
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+PASSAGE_CHARS = 1200
+
+
+def split_passages(text: str, max_chars: int = PASSAGE_CHARS) -> List[str]:
+    """Group paragraphs into passages of roughly `max_chars` characters."""
+    passages = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            passages.append(current)
+            current = ""
+        # Very long paragraphs (tables, run-together text) are hard-split.
+        while len(paragraph) > max_chars:
+            passages.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        passages.append(current)
+    return passages
+
+
+def to_match_query(query: str) -> str:
+    # Quote every term so user text can't trip FTS5 syntax; OR them and let BM25 rank.
+    terms = re.findall(r"\w+", query.lower())
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class FullTextIndex:
+    """
+    SQLite FTS5 index over paper summaries and parsed paper text.
+
+    Every paper contributes passages of one or more kinds ("summary",
+    "parsed"); re-indexing a kind for a paper replaces its previous passages,
+    so updates are incremental, and is skipped when the text hasn't changed.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.is_new = not self.db_path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+                paper_id UNINDEXED,
+                kind UNINDEXED,
+                title,
+                body,
+                tokenize = 'porter unicode61'
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS indexed (
+                paper_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                PRIMARY KEY (paper_id, kind)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def index(self, paper_id: str, kind: str, title: str, text: str) -> int:
+        """Index `text` as the passages of (paper_id, kind); returns how many, 0 if unchanged."""
+        text_hash = hashlib.sha256(f"{title}\0{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text_hash FROM indexed WHERE paper_id = ? AND kind = ?", (paper_id, kind)
+            ).fetchone()
+            if row is not None and row[0] == text_hash:
+                return 0
+        rows = [(paper_id, kind, title, passage) for passage in split_passages(text)]
+        with self._lock:
+            self._conn.execute("DELETE FROM passages WHERE paper_id = ? AND kind = ?", (paper_id, kind))
+            self._conn.executemany(
+                "INSERT INTO passages (paper_id, kind, title, body) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed (paper_id, kind, text_hash) VALUES (?, ?, ?)",
+                (paper_id, kind, text_hash),
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        match = to_match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT paper_id, kind, title, body, bm25(passages, 0.0, 0.0, 2.0, 1.0) AS score
+                FROM passages
+                WHERE passages MATCH ?
+                ORDER BY score
+                LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+        return [
+            {"paper_id": paper_id, "kind": kind, "title": title, "passage": body, "score": -score}
+            for paper_id, kind, title, body, score in rows
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM passages")
+            self._conn.execute("DELETE FROM indexed")
+            self._conn.commit()
@@ -0,0 +1,31 @@
+"""
+Helpers for the append-only JSONL logs (topic paper logs, chat session logs).
+
+A crash mid-append can leave a torn last line. Readers skip it, since every
+line before it is intact, and writers terminate it before appending so it
+doesn't swallow the first new record.
+"""
+import json
+import os
+from typing import Any, Iterable, Iterator, TextIO
+
+
+def open_for_append(path) -> TextIO:
+    """Open `path` for appending text, first terminating a torn last line."""
+    f = open(path, "a", encoding="utf-8")
+    if f.tell():
+        # Only the last byte matters; the log may hold megabytes of tool results.
+        with open(path, "rb") as tail:
+            tail.seek(-1, os.SEEK_END)
+            if tail.read(1) != b"\n":
+                f.write("\n")
+    return f
+
+
+def iter_records(lines: Iterable[str]) -> Iterator[Any]:
+    """Parsed JSON records from `lines`, skipping any that are torn."""
+    for line in lines:
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
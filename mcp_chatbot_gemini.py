@@ -1,28 +1,131 @@
 from dotenv import load_dotenv
+import argparse
+import copy
 import os
 import asyncio
-import nest_asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Set
 import json
+import time
 from contextlib import AsyncExitStack
+from pathlib import Path
 
 from google import genai
 from google.genai import types
 from mcp import ClientSession, StdioServerParameters
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from chat_history import HistoryManager
+from metrics import metrics
+from rate_limit import TokenBucket, call_with_retries
+from scheduler import RequestScheduler, check_session_name, serve_jsonl_file, serve_socket
+from session_log import SessionLog
+from tool_cache import ToolResultCache, cache_key
+from tool_declarations import DeclarationCache, select_servers, tools_fingerprint
 
-nest_asyncio.apply()
 load_dotenv()
 
+# Seconds a single server may take to spawn, initialize and list its capabilities.
+DEFAULT_STARTUP_TIMEOUT = 60
+# Tool calls from one Gemini turn that may run at the same time on a single server.
+DEFAULT_MAX_CONCURRENT_CALLS = 4
+# Approximate tokens of conversation history re-sent with each request.
+DEFAULT_HISTORY_TOKEN_BUDGET = 32000
+# Bounds for the client-side cache of results from tools listed under "cacheTools".
+TOOL_CACHE_MAX_ENTRIES = 256
+TOOL_CACHE_MAX_BYTES = 5 * 1024 * 1024
+# Cleaned Gemini function declarations, reused while a server's tool list is unchanged.
+TOOL_DECLARATION_CACHE_PATH = ".cache/tool_declarations.json"
+# Optional metrics export file: `.prom` for Prometheus text format, anything else for JSONL snapshots.
+METRICS_EXPORT_PATH = os.getenv("METRICS_EXPORT")
+# One append-only log per named session, for --resume.
+SESSION_DIR = ".cache/sessions"
+# Every server is pinged this often; one that stops answering is restarted.
+HEALTH_CHECK_INTERVAL = 15
+HEALTH_CHECK_TIMEOUT = 10
+# A server that is alive but busy can miss a ping, so only this many timeouts
+# in a row count as a hang. A closed connection is restarted straight away.
+HEALTH_CHECK_MAX_TIMEOUTS = 3
+# Restart attempts for a crashed server, with exponential backoff between them.
+MAX_RESTART_ATTEMPTS = 5
+RESTART_BACKOFF_BASE = 1
+RESTART_BACKOFF_MAX = 30
+# Gemini calls are throttled to this many per minute across all conversations
+# (0 disables the limiter); rate-limit and transient errors are retried with
+# jittered exponential backoff.
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "0"))
+GEMINI_BURST = 5
+GEMINI_MAX_RETRIES = 4
+GEMINI_BACKOFF_BASE = 1
+GEMINI_BACKOFF_MAX = 30
+# Conversations answered at the same time when serving requests (--requests-file / --listen).
+DEFAULT_MAX_ACTIVE_CONVERSATIONS = 4
+# Conversations kept in memory when serving requests; the least recently used
+# ones past this count, and any idle this long, are closed. A closed
+# conversation picks up again from its session log on its next request.
+MAX_CONVERSATIONS = 64
+CONVERSATION_IDLE_SECONDS = 30 * 60
+
+
+def is_connection_error(error: Exception) -> bool:
+    # An error response from the server (unknown tool, bad arguments) means the
+    # connection is fine; anything else raised by the session means it is gone.
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return not isinstance(error, TimeoutError)
+
+
+def session_log_path(session_name: str) -> Path:
+    return Path(SESSION_DIR) / f"{check_session_name(session_name)}.jsonl"
+
 class GeminiMCPChatBot:
 
-    def __init__(self):
+    def __init__(self, session_name: str = "default", resume: bool = False):
         self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
         self.sessions: Dict[str, ClientSession] = {}
         self.messages: List[types.Content] = []
         self.tool_config = None
         self.exit_stack = AsyncExitStack()
         self.resources = []
+        self.server_timings: Dict[str, Dict[str, float]] = {}
+        self.server_configs: Dict[str, Dict] = {}
+        self._server_tasks: Dict[str, asyncio.Task] = {}
+        self._server_stops: Dict[str, asyncio.Event] = {}
+        self._restarts: Dict[str, asyncio.Task] = {}
+        self._health_timeouts: Dict[str, int] = {}
+        self._supervisor_task = None
+        # Tools that are safe to call again after a dropped connection.
+        self.idempotent_tools = set()
+        self.tool_servers: Dict[str, str] = {}
+        self.server_limits: Dict[str, int] = {}
+        self.server_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.tool_cache = ToolResultCache(TOOL_CACHE_MAX_ENTRIES, TOOL_CACHE_MAX_BYTES)
+        self.tool_cache_ttls: Dict[str, float] = {}
+        self.declaration_cache = DeclarationCache(TOOL_DECLARATION_CACHE_PATH)
+        self.server_declarations: Dict[str, List[types.FunctionDeclaration]] = {}
+        self.server_tool_text: Dict[str, str] = {}
+        # Send only the tools of servers that look relevant to each query (set TOOL_SUBSETTING=1).
+        self.tool_subsetting = os.getenv("TOOL_SUBSETTING", "").lower() in ("1", "true", "yes")
+        self.active_tool_config = None
+        self.gemini_limiter = (
+            TokenBucket(GEMINI_REQUESTS_PER_MINUTE / 60, GEMINI_BURST) if GEMINI_REQUESTS_PER_MINUTE else None
+        )
+        # Conversations by session name when serving many users; this bot is the first.
+        # Ordered from least to most recently used.
+        self.conversations: Dict[str, "GeminiMCPChatBot"] = {session_name: self}
+        self._answering: Set[str] = set()
+        self.last_used = time.monotonic()
+        self._started_at = time.time()
+        metrics.export_path = METRICS_EXPORT_PATH
+        self.session_log = SessionLog(session_log_path(session_name))
+        self.resume = resume
+        self.history = HistoryManager(
+            token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", DEFAULT_HISTORY_TOKEN_BUDGET)),
+            summarizer=self.summarize_history
+        )
 
     def clean_schema_for_gemini(self, schema: Dict[str, Any]) -> Dict[str, Any]:
         if not isinstance(schema, dict):
@@ -54,11 +157,18 @@ class GeminiMCPChatBot:
             return [
                 {
                     "name": name,
+                    # Either a command to spawn over stdio, or the URL of an already running server.
                     "params": StdioServerParameters(
                         command=cfg["command"],
                         args=cfg["args"],
                         env=cfg.get("env")
-                    )
+                    ) if "url" not in cfg else None,
+                    "url": cfg.get("url"),
+                    "transport": cfg.get("transport", "sse" if cfg.get("url", "").rstrip("/").endswith("/sse") else "streamable-http"),
+                    "startup_timeout": cfg.get("startupTimeout", DEFAULT_STARTUP_TIMEOUT),
+                    "max_concurrent_calls": cfg.get("maxConcurrentCalls", DEFAULT_MAX_CONCURRENT_CALLS),
+                    "cache_tools": cfg.get("cacheTools", {}),
+                    "idempotent_tools": cfg.get("idempotentTools", [])
                 }
                 for name, cfg in config.get("mcpServers", {}).items()
             ]
@@ -66,7 +176,214 @@ class GeminiMCPChatBot:
             print(f"❌ Failed to load server config: {e}")
             return []
 
-    async def connect_to_server_and_setup_tools(self):
+    async def _discover_server(self, name: str, session: ClientSession) -> Dict[str, Any]:
+        # Tools, prompts and resources are independent requests on the same
+        # session, so ask for all of them at once.
+        tools_response, prompts_response, resources_response = await asyncio.gather(
+            session.list_tools(),
+            session.list_prompts(),
+            session.list_resources(),
+            return_exceptions=True
+        )
+        if isinstance(tools_response, BaseException):
+            raise tools_response
+        return {
+            "tools": tools_response,
+            "prompts": prompts_response,
+            "resources": resources_response,
+        }
+
+    async def _open_transport(self, stack: AsyncExitStack, server: Dict):
+        if not server["url"]:
+            return await stack.enter_async_context(stdio_client(server["params"]))
+        if server["transport"] == "sse":
+            return await stack.enter_async_context(sse_client(server["url"]))
+        read, write, _ = await stack.enter_async_context(streamablehttp_client(server["url"]))
+        return read, write
+
+    async def _run_server(self, server: Dict, ready: asyncio.Future, stop: asyncio.Event):
+        # Each server lives in its own task so that its stdio/session contexts
+        # are entered and exited by the same task, and servers can start in parallel.
+        name = server["name"]
+        try:
+            async with AsyncExitStack() as stack:
+                async with asyncio.timeout(server["startup_timeout"]):
+                    started = time.perf_counter()
+                    read, write = await self._open_transport(stack, server)
+                    session = await stack.enter_async_context(ClientSession(read, write))
+                    await session.initialize()
+                    connected = time.perf_counter()
+                    discovery = await self._discover_server(name, session)
+                    discovered = time.perf_counter()
+
+                self.server_timings[name] = {
+                    "connect": connected - started,
+                    "discover": discovered - connected,
+                    "total": discovered - started,
+                }
+                ready.set_result((session, discovery))
+                await stop.wait()
+        except TimeoutError:
+            if not ready.done():
+                ready.set_exception(TimeoutError(f"startup timed out after {server['startup_timeout']}s"))
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+
+    def _register_server(self, name: str, session: ClientSession, discovery: Dict[str, Any]) -> List[types.FunctionDeclaration]:
+        self.sessions[name] = session
+        function_declarations = []
+
+        tools = discovery["tools"].tools
+        fingerprint = tools_fingerprint(tools)
+        declarations = self.declaration_cache.get(name, fingerprint)
+        if declarations is None:
+            declarations = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": self.clean_schema_for_gemini(tool.inputSchema)
+                }
+                for tool in tools
+            ]
+            self.declaration_cache.put(name, fingerprint, declarations)
+        else:
+            print(f"♻️ Using cached tool declarations for {name}")
+
+        for tool, declaration in zip(tools, declarations):
+            func_decl = types.FunctionDeclaration(**declaration)
+            function_declarations.append(func_decl)
+            self.sessions[tool.name] = session
+            self.tool_servers[tool.name] = name
+            if tool.annotations and (tool.annotations.readOnlyHint or tool.annotations.idempotentHint):
+                self.idempotent_tools.add(tool.name)
+            print(f"✅ Tool loaded: {tool.name}")
+
+        self.server_declarations[name] = function_declarations
+        self.server_tool_text[name] = " ".join(
+            f"{name} {tool.name} {tool.description or ''}" for tool in tools
+        )
+
+        # Not all servers implement prompts. Handle this gracefully.
+        prompts_response = discovery["prompts"]
+        if isinstance(prompts_response, BaseException):
+            if "Method not found" in str(prompts_response):
+                print(f"ℹ️ Server '{name}' does not provide prompts (this is normal).")
+            else:
+                print(f"⚠️ Could not list prompts from '{name}': {prompts_response}")
+        elif prompts_response and prompts_response.prompts:
+            for prompt in prompts_response.prompts:
+                self.sessions[prompt.name] = session
+                print(f"🧠 Prompt loaded: {prompt.name}")
+
+        # Not all servers implement resources. We'll handle this gracefully.
+        resources_response = discovery["resources"]
+        if isinstance(resources_response, BaseException):
+            # Check for the specific error to confirm it's what we expect.
+            if "Method not found" in str(resources_response):
+                print(f"ℹ️ Server '{name}' does not provide resources (this is normal).")
+            else:
+                # If it's a different error, we still want to know about it.
+                print(f"⚠️ Could not list resources from '{name}': {resources_response}")
+        elif resources_response and resources_response.resources:
+            for res in resources_response.resources:
+                uri = str(res.uri)
+                self.resources.append(uri)
+                self.sessions[uri] = session
+                print(f"📚 Resource available: {uri}")
+
+        return function_declarations
+
+    def _start_server(self, server: Dict) -> asyncio.Future:
+        """Launch the server's task; the future resolves to (session, discovery)."""
+        name = server["name"]
+        ready = asyncio.get_running_loop().create_future()
+        self._server_stops[name] = asyncio.Event()
+        self._server_tasks[name] = asyncio.create_task(self._run_server(server, ready, self._server_stops[name]))
+        return ready
+
+    async def _stop_server(self, name: str):
+        self._server_stops[name].set()
+        task = self._server_tasks.pop(name, None)
+        if task is None:
+            return
+        try:
+            # Closing the transport terminates a stdio server; don't let one
+            # that ignores that hold up the restart.
+            await asyncio.wait_for(task, HEALTH_CHECK_TIMEOUT)
+        except Exception:
+            pass
+
+    async def _shutdown_servers(self):
+        if self._supervisor_task:
+            self._supervisor_task.cancel()
+        for task in self._restarts.values():
+            task.cancel()
+        for stop in self._server_stops.values():
+            stop.set()
+        if self._server_tasks:
+            await asyncio.gather(*self._server_tasks.values(), return_exceptions=True)
+
+    def restart_server(self, name: str) -> asyncio.Task:
+        """Restart a server, or join the restart already under way; the task's result is whether it worked."""
+        task = self._restarts.get(name)
+        if task is None:
+            task = asyncio.create_task(self._restart_server(name))
+            self._restarts[name] = task
+            task.add_done_callback(lambda _: self._restarts.pop(name, None))
+        return task
+
+    async def _restart_server(self, name: str) -> bool:
+        old_session = self.sessions.get(name)
+        await self._stop_server(name)
+        for attempt in range(MAX_RESTART_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** (attempt - 1)))
+            try:
+                session, discovery = await self._start_server(self.server_configs[name])
+            except Exception as e:
+                print(f"\n❌ Restart {attempt + 1}/{MAX_RESTART_ATTEMPTS} of {name} server failed: {e}")
+                self._server_tasks.pop(name, None)
+                continue
+            # Rediscover just this server: drop what pointed at the dead session
+            # and register the new one, leaving every other server untouched.
+            for key in [key for key, value in self.sessions.items() if value is old_session]:
+                del self.sessions[key]
+            # Updated in place, since conversations forked from this bot share these objects.
+            self.resources[:] = [uri for uri in self.resources if uri in self.sessions]
+            self._register_server(name, session, discovery)
+            self.declaration_cache.save()
+            self.tool_config.function_declarations = [
+                decl for decls in self.server_declarations.values() for decl in decls
+            ]
+            self._health_timeouts[name] = 0
+            metrics.inc("server_restarts_total", server=name)
+            print(f"🔁 Restarted {name} server")
+            return True
+        print(f"\n❌ Giving up on {name} server after {MAX_RESTART_ATTEMPTS} restart attempts")
+        return False
+
+    async def _check_server(self, name: str):
+        try:
+            await asyncio.wait_for(self.sessions[name].send_ping(), HEALTH_CHECK_TIMEOUT)
+            self._health_timeouts[name] = 0
+        except TimeoutError:
+            self._health_timeouts[name] = self._health_timeouts.get(name, 0) + 1
+            if self._health_timeouts[name] >= HEALTH_CHECK_MAX_TIMEOUTS:
+                print(f"\n⚠️ {name} server stopped answering pings; restarting it...")
+                self.restart_server(name)
+        except Exception as e:
+            print(f"\n⚠️ Lost connection to {name} server ({str(e) or type(e).__name__}); restarting it...")
+            self.restart_server(name)
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+            names = [name for name in self.server_declarations if name in self.sessions and name not in self._restarts]
+            await asyncio.gather(*(self._check_server(name) for name in names))
+
+    async def connect_to_server_and_setup_tools(self, serve=None):
+        """Start every server, then run `serve()` (default: the interactive chat loop)."""
         servers = self.load_server_config()
         if not servers:
             print("❌ No server configurations found. Exiting.")
@@ -74,128 +391,331 @@ class GeminiMCPChatBot:
 
         all_function_declarations = []
 
+        print(f"\n🔄 Connecting to {len(servers)} servers: {', '.join(s['name'] for s in servers)}...")
+        self.exit_stack.push_async_callback(self._shutdown_servers)
+        # Read the saved session on a thread while the servers start up.
+        resume_load = asyncio.create_task(asyncio.to_thread(self.session_log.load)) if self.resume else None
+        startup_started = time.perf_counter()
+        ready_futures = []
         for server in servers:
+            self.server_configs[server["name"]] = server
+            ready_futures.append(self._start_server(server))
+
+        results = await asyncio.gather(*ready_futures, return_exceptions=True)
+        startup_elapsed = time.perf_counter() - startup_started
+
+        # Register in config order so tool declarations are stable between runs.
+        for server, result in zip(servers, results):
             name = server["name"]
-            try:
-                print(f"\n🔄 Connecting to {name} server...")
-                read, write = await self.exit_stack.enter_async_context(stdio_client(server["params"]))
-                session = await self.exit_stack.enter_async_context(ClientSession(read, write))
-                await session.initialize()
-                self.sessions[name] = session
-
-                response = await session.list_tools()
-                for tool in response.tools:
-                    cleaned_schema = self.clean_schema_for_gemini(tool.inputSchema)
-                    func_decl = types.FunctionDeclaration(
-                        name=tool.name,
-                        description=tool.description,
-                        parameters=cleaned_schema
-                    )
-                    all_function_declarations.append(func_decl)
-                    self.sessions[tool.name] = session
-                    print(f"✅ Tool loaded: {tool.name}")
-
-                # --- START: NEWLY ADDED CODE ---
-                # Not all servers implement prompts. Handle this gracefully.
-                try:
-                    prompts_response = await session.list_prompts()
-                    if prompts_response and prompts_response.prompts:
-                        for prompt in prompts_response.prompts:
-                            self.sessions[prompt.name] = session
-                            print(f"🧠 Prompt loaded: {prompt.name}")
-                except Exception as e:
-                    if "Method not found" in str(e):
-                        print(f"ℹ️ Server '{name}' does not provide prompts (this is normal).")
-                    else:
-                        print(f"⚠️ Could not list prompts from '{name}': {e}")
-                # --- END: NEWLY ADDED CODE ---
-
-                # Not all servers implement resources. We'll handle this gracefully.
-                try:
-                    resources_response = await session.list_resources()
-                    if resources_response and resources_response.resources:
-                        for res in resources_response.resources:
-                            uri = str(res.uri)
-                            self.resources.append(uri)
-                            self.sessions[uri] = session
-                            print(f"📚 Resource available: {uri}")
-                except Exception as e:
-                    # Check for the specific error to confirm it's what we expect.
-                    if "Method not found" in str(e):
-                        print(f"ℹ️ Server '{name}' does not provide resources (this is normal).")
-                    else:
-                        # If it's a different error, we still want to know about it.
-                        print(f"⚠️ Could not list resources from '{name}': {e}")
+            if isinstance(result, BaseException):
+                print(f"\n❌ Failed to connect to {name} server: {result}")
+                continue
+            print(f"\n🔌 Connected to {name} server")
+            self.server_limits[name] = server["max_concurrent_calls"]
+            self.tool_cache_ttls.update(server["cache_tools"])
+            self.idempotent_tools.update(server["cache_tools"], server["idempotent_tools"])
+            session, discovery = result
+            all_function_declarations.extend(self._register_server(name, session, discovery))
 
-            except Exception as e:
-                print(f"❌ Failed to connect to {name} server: {e}")
+        self.declaration_cache.save()
+        if resume_load is not None:
+            self._restore_session(*await resume_load)
+        self.session_log.open(resume=self.resume)
+        self.exit_stack.callback(self._close_conversations)
+
+        print("\n⏱️ Server startup timings:")
+        for name, timing in self.server_timings.items():
+            print(f"   {name}: {timing['total']:.2f}s (connect {timing['connect']:.2f}s, discover {timing['discover']:.2f}s)")
+        print(f"   all servers: {startup_elapsed:.2f}s")
 
         if all_function_declarations:
             self.tool_config = types.Tool(function_declarations=all_function_declarations)
             print(f"\n🎉 Total tools available: {len(all_function_declarations)}")
-            await self.chat_loop()
+            self._supervisor_task = asyncio.create_task(self._supervise())
+            await (serve or self.chat_loop)()
         else:
             print("❌ No tools available. Exiting.")
 
+    def _restore_session(self, messages: List[types.Content], tool_results: List[Dict[str, Any]]):
+        self.messages = messages
+        # Results of cacheable tools that are still fresh are served from the
+        # cache again, so resuming doesn't repeat those calls.
+        restored = 0
+        for record in tool_results:
+            remaining = record["ts"] + record["ttl"] - time.time()
+            if remaining > 0 and record["tool"] in self.tool_cache_ttls:
+                self.tool_cache.put(cache_key(record["tool"], record["args"]), record["response"], remaining)
+                restored += 1
+        exchanges = sum(1 for m in messages if m.role == "user" and any(p.text for p in m.parts or []))
+        print(f"\n♻️ Resumed session: {exchanges} exchanges, {len(messages)} messages, {restored} cached tool results")
+
+    def fork(self, session_name: str) -> "GeminiMCPChatBot":
+        """
+        A separate conversation (messages, history, session log) that shares
+        this bot's server sessions, tool cache and Gemini rate limiter.
+        """
+        conversation = copy.copy(self)
+        conversation.messages = []
+        conversation.active_tool_config = None
+        conversation.last_used = time.monotonic()
+        conversation.session_log = SessionLog(session_log_path(session_name))
+        conversation.history = HistoryManager(
+            token_budget=self.history.token_budget,
+            summarizer=conversation.summarize_history
+        )
+        return conversation
+
+    async def answer(self, session_name: str, query: str) -> str:
+        """Scheduler handler: answer `query` in the named conversation, starting it on first use."""
+        conversation = self.conversations.pop(session_name, None)
+        if conversation is None:
+            self._evict_conversations()
+            conversation = self.fork(session_name)
+            log_path = conversation.session_log.path
+            # A conversation evicted earlier in this run continues from its log instead of starting over.
+            resume = self.resume or (log_path.exists() and log_path.stat().st_mtime >= self._started_at)
+            if resume:
+                conversation._restore_session(*await asyncio.to_thread(conversation.session_log.load))
+            conversation.session_log.open(resume=resume)
+        self.conversations[session_name] = conversation
+        self._answering.add(session_name)
+        try:
+            return await conversation.process_query(query)
+        finally:
+            self._answering.discard(session_name)
+            conversation.last_used = time.monotonic()
+
+    def _evict_conversations(self):
+        """Close idle conversations, and the least recently used ones beyond MAX_CONVERSATIONS."""
+        now = time.monotonic()
+        for name, conversation in list(self.conversations.items()):
+            if conversation is self or name in self._answering:
+                continue
+            if len(self.conversations) < MAX_CONVERSATIONS and now - conversation.last_used < CONVERSATION_IDLE_SECONDS:
+                break
+            conversation.session_log.close()
+            del self.conversations[name]
+
+    def _close_conversations(self):
+        for conversation in self.conversations.values():
+            conversation.session_log.close()
+
+    def _append_message(self, content: types.Content):
+        self.messages.append(content)
+        self.session_log.append_message(content)
+
     async def find_tool_session(self, name: str):
         return self.sessions.get(name)
 
-    async def process_query(self, query: str):
-        if query:
-            self.messages.append(types.Content(role="user", parts=[types.Part(text=query)]))
+    def _server_semaphore(self, server_name: str) -> asyncio.Semaphore:
+        semaphore = self.server_semaphores.get(server_name)
+        if semaphore is None:
+            limit = self.server_limits.get(server_name, DEFAULT_MAX_CONCURRENT_CALLS)
+            semaphore = asyncio.Semaphore(limit)
+            self.server_semaphores[server_name] = semaphore
+        return semaphore
 
-        while True:
+    async def call_tool(self, part: types.Part) -> Dict[str, Any]:
+        func_name = part.function_call.name
+        func_args = part.function_call.args or {}
+        cache_ttl = self.tool_cache_ttls.get(func_name)
+        key = cache_key(func_name, func_args)
+        if cache_ttl:
+            cached = self.tool_cache.get(key)
+            if cached is not None:
+                print(f"\n♻️ Cache hit for tool '{func_name}' with args: {func_args}")
+                metrics.inc("tool_cache_hits_total", tool=func_name)
+                return cached
+
+        print(f"\n🛠️ Calling tool '{func_name}' with args: {func_args}")
+        server_name = self.tool_servers.get(func_name, func_name)
+        try:
+            result = await self._call_server_tool(server_name, func_name, func_args)
+            if result.isError:
+                metrics.inc("tool_call_errors_total", server=server_name, tool=func_name)
+            content = result.content
+
+            if isinstance(content, list):
+                content = {"results": content}
+            elif not isinstance(content, dict):
+                content = {"message": str(content)}
+            if cache_ttl and not result.isError:
+                self.tool_cache.put(key, content, cache_ttl)
+                self.session_log.append_tool_result(func_name, dict(func_args), content, cache_ttl)
+            return content
+        except Exception as e:
+            print(f"❌ Tool execution failed: {e}")
+            # Still answer the function call so the model can see what went wrong.
+            return {"error": str(e)}
+
+    async def _call_server_tool(self, server_name: str, func_name: str, func_args: Dict[str, Any]):
+        # A call made while its server is restarting waits for the new session.
+        # If the connection drops mid-call the server is restarted, and the
+        # call is sent again only when the tool is safe to repeat.
+        for attempt in range(2):
+            restart = self._restarts.get(server_name)
+            if restart is not None:
+                await asyncio.shield(restart)
+            session = await self.find_tool_session(func_name)
+            if not session:
+                raise Exception(f"Tool '{func_name}' not found on any server")
             try:
-                response = self.client.models.generate_content(
-                    model="gemini-2.0-flash-exp",
-                    contents=self.messages,
-                    config=types.GenerateContentConfig(tools=[self.tool_config])
-                )
+                async with self._server_semaphore(server_name):
+                    started = time.perf_counter()
+                    try:
+                        return await session.call_tool(func_name, arguments=func_args)
+                    finally:
+                        metrics.observe("tool_call_seconds", time.perf_counter() - started, server=server_name, tool=func_name)
             except Exception as e:
-                print(f"❌ Generation error: {e}")
-                break
+                if server_name not in self.server_configs or not is_connection_error(e):
+                    raise
+                print(f"\n⚠️ Lost connection to {server_name} server during '{func_name}'; restarting it...")
+                restarted = await asyncio.shield(self.restart_server(server_name))
+                if not restarted or attempt or func_name not in self.idempotent_tools:
+                    raise
+                metrics.inc("tool_call_retries_total", server=server_name, tool=func_name)
+                print(f"🔁 Retrying '{func_name}'")
+
+    async def summarize_history(self, transcript: str) -> str:
+        with metrics.timer("gemini_summarize_seconds"):
+            response = await call_with_retries(
+                lambda: self.client.aio.models.generate_content(
+                    model="gemini-2.0-flash-exp",
+                    contents=(
+                        "Summarize this earlier part of a research assistant conversation in a few "
+                        "bullet points. Keep paper IDs, titles, file names and open questions.\n\n"
+                        + transcript
+                    )
+                ),
+                self.gemini_limiter, GEMINI_MAX_RETRIES, GEMINI_BACKOFF_BASE, GEMINI_BACKOFF_MAX, name="gemini"
+            )
+        return response.text
 
-            candidate = response.candidates[0]
-            tool_calls = []
-            new_parts = []
+    async def generate_turn(self):
+        """
+        Stream one model response. Text is printed as it arrives and every
+        function call is started as soon as its part is complete, so tools can
+        already be running while the rest of the response is still streaming.
+        """
+        self.messages = await self.history.compact(self.messages)
+        request = self.history.record_request(self.messages)
+        if request.get("dropped_exchanges"):
+            # Old exchanges were summarized away; shrink the session log to match.
+            self.session_log.checkpoint(self.messages)
 
-            for part in candidate.content.parts:
-                if part.function_call:
-                    tool_calls.append(part)
-                elif hasattr(part, "text"):
-                    print(f"\n🤖 {part.text}")
-                    new_parts.append(part)
+        started = time.perf_counter()
+        first_token = None
+        first_tool_call = None
+        text_chunks = []
+        tool_calls = []
+        tool_tasks = []
+
+        async def stream_response():
+            nonlocal first_token, first_tool_call
+            stream = await self.client.aio.models.generate_content_stream(
+                model="gemini-2.0-flash-exp",
+                contents=self.messages,
+                config=types.GenerateContentConfig(tools=[self.active_tool_config or self.tool_config])
+            )
+            async for chunk in stream:
+                if not chunk.candidates or not chunk.candidates[0].content:
+                    continue
+                for part in chunk.candidates[0].content.parts or []:
+                    if part.function_call:
+                        if first_tool_call is None:
+                            first_tool_call = time.perf_counter() - started
+                        tool_calls.append(part)
+                        tool_tasks.append(asyncio.create_task(self.call_tool(part)))
+                    elif part.text:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                            print("\n🤖 ", end="")
+                        print(part.text, end="", flush=True)
+                        text_chunks.append(part.text)
+
+        try:
+            # A rate-limited or failed request is retried only while nothing has
+            # been received: after that, text is printed and tools are running.
+            await call_with_retries(
+                stream_response, self.gemini_limiter, GEMINI_MAX_RETRIES, GEMINI_BACKOFF_BASE, GEMINI_BACKOFF_MAX,
+                name="gemini", can_retry=lambda: not (text_chunks or tool_calls)
+            )
+        except BaseException:
+            for task in tool_tasks:
+                task.cancel()
+            raise
+        finally:
+            if text_chunks:
+                print()
+
+        def fmt(seconds):
+            return f"{seconds:.2f}s" if seconds is not None else "—"
+        total = time.perf_counter() - started
+        metrics.observe("gemini_generate_seconds", total)
+        if first_token is not None:
+            metrics.observe("gemini_first_token_seconds", first_token)
+        print(f"⏱️ first token: {fmt(first_token)} | first tool call: {fmt(first_tool_call)} | total: {fmt(total)}")
+        payload = f"📦 request: {request['messages']} messages, {request['bytes'] / 1024:.1f} KB (~{request['est_tokens']} tokens)"
+        if "before_bytes" in request:
+            payload += f", compacted from {request['before_bytes'] / 1024:.1f} KB"
+        print(payload)
+
+        return "".join(text_chunks), tool_calls, tool_tasks
+
+    def _recently_used_servers(self) -> List[str]:
+        # Servers whose tools were called since the last user message, so
+        # follow-up questions keep access to them.
+        servers = []
+        for message in reversed(self.messages):
+            for part in message.parts or []:
+                if part.function_call and part.function_call.name in self.tool_servers:
+                    servers.append(self.tool_servers[part.function_call.name])
+                elif message.role == "user" and part.text:
+                    return servers
+        return servers
+
+    def tool_config_for(self, query: str) -> types.Tool:
+        if not self.tool_subsetting or len(self.server_declarations) <= 1:
+            return self.tool_config
+        selected = select_servers(query, self.server_tool_text, always=self._recently_used_servers())
+        declarations = [
+            declaration
+            for name, server_declarations in self.server_declarations.items()
+            if name in selected
+            for declaration in server_declarations
+        ]
+        print(f"🧰 Sending {len(declarations)} of {len(self.tool_config.function_declarations)} tools "
+              f"(servers: {', '.join(sorted(selected))})")
+        return types.Tool(function_declarations=declarations)
+
+    async def process_query(self, query: str) -> str:
+        """Answer `query` (running any tools the model asks for); returns the final model text."""
+        if query:
+            self.active_tool_config = self.tool_config_for(query)
+            self._append_message(types.Content(role="user", parts=[types.Part(text=query)]))
+
+        while True:
+            # Generation errors (after retries) propagate to the caller.
+            text, tool_calls, tool_tasks = await self.generate_turn()
 
             if not tool_calls:
-                if new_parts:
-                    self.messages.append(types.Content(role="model", parts=new_parts))
-                break
+                if text:
+                    self._append_message(types.Content(role="model", parts=[types.Part(text=text)]))
+                return text
+
+            # The calls were started while streaming and run concurrently; each
+            # one catches its own errors so a failing tool doesn't cancel the others.
+            results = await asyncio.gather(*tool_tasks)
 
-            for part in tool_calls:
-                func_name = part.function_call.name
-                func_args = part.function_call.args or {}
-                print(f"\n🛠️ Calling tool '{func_name}' with args: {func_args}")
-                try:
-                    session = await self.find_tool_session(func_name)
-                    if not session:
-                        raise Exception(f"Tool '{func_name}' not found on any server")
-                    result = await session.call_tool(func_name, arguments=func_args)
-                    content = result.content
-
-                    if isinstance(content, list):
-                        content = {"results": content}
-                    elif not isinstance(content, dict):
-                        content = {"message": str(content)}
-
-                    self.messages.append(types.Content(role="model", parts=[part]))
-                    self.messages.append(types.Content(role="user", parts=[
-                        types.Part(function_response={
-                            "name": func_name,
-                            "response": content
-                        })
-                    ]))
-                except Exception as e:
-                    print(f"❌ Tool execution failed: {e}")
+            # Append in the order the model issued the calls, not completion order.
+            for part, content in zip(tool_calls, results):
+                self._append_message(types.Content(role="model", parts=[part]))
+                self._append_message(types.Content(role="user", parts=[
+                    types.Part(function_response={
+                        "name": part.function_call.name,
+                        "response": content
+                    })
+                ]))
 
     async def list_prompts(self):
         print("\n📋 Available prompts:")
@@ -257,16 +777,37 @@ class GeminiMCPChatBot:
         except Exception as e:
             print(f"❌ Failed to read resource '{uri}': {e}")
 
+    async def show_stats(self, export: bool = False):
+        print("\n📊 Chatbot metrics:")
+        print(metrics.render_text())
+        session = self.sessions.get("server_metrics")
+        if session:
+            try:
+                result = await session.call_tool("server_metrics", arguments={"export": export})
+                print(f"\n📊 {self.tool_servers.get('server_metrics')} server metrics:")
+                print("\n".join(item.text for item in result.content if hasattr(item, "text")))
+            except Exception as e:
+                print(f"❌ Failed to fetch server metrics: {e}")
+        if export:
+            path = metrics.export()
+            print(f"💾 Exported chatbot metrics to {path}" if path else "No export file configured (set METRICS_EXPORT).")
+
     async def chat_loop(self):
         print("\n💬 Gemini MCP ChatBot Started!")
         print("Type your queries or '/prompt <name> <arg1=value1>' or '/prompts'. Type 'quit' to exit.")
         print("Use @<resource> to access resources like papers://folders or papers://<topic>")
+        print("Long resources are paged: add ?page=N, e.g. @<topic>?page=2")
+        print("Type '/stats' for latency metrics ('/stats export' also writes them to the metrics file).")
         while True:
             try:
-                query = input("\nQuery: ").strip()
+                # Read input off the event loop so server sessions keep being serviced.
+                query = (await asyncio.to_thread(input, "\nQuery: ")).strip()
                 if query.lower() == "quit":
                     print("👋 Goodbye!")
                     break
+                if query.startswith("/stats"):
+                    await self.show_stats(export="export" in query.split()[1:])
+                    continue
                 if query.startswith("/prompts"):
                     await self.list_prompts()
                     continue
@@ -293,11 +834,42 @@ class GeminiMCPChatBot:
                 print(f"❌ Error: {e}")
 
 async def main():
-    bot = GeminiMCPChatBot()
+    parser = argparse.ArgumentParser(description="Gemini chatbot for MCP servers")
+    parser.add_argument("--session", default="default", type=check_session_name, help=f"session name; its log is kept in {SESSION_DIR}/")
+    parser.add_argument("--resume", action="store_true", help="continue the saved session instead of starting over")
+    parser.add_argument("--requests-file", type=Path,
+                        help='answer the JSONL requests ({"id", "session", "query", "priority"}) in this file, then exit')
+    parser.add_argument("--responses-file", type=Path, help="where to append answers (default: <requests-file>.responses.jsonl)")
+    parser.add_argument("--listen", metavar="[HOST:]PORT", help="accept JSONL requests over TCP instead of reading input")
+    parser.add_argument("--max-active", type=int, default=DEFAULT_MAX_ACTIVE_CONVERSATIONS,
+                        help="conversations answered at the same time when serving requests")
+    parser.add_argument("--gemini-rpm", type=float, default=GEMINI_REQUESTS_PER_MINUTE,
+                        help="Gemini requests per minute across all conversations (0 = unlimited)")
+    args = parser.parse_args()
+    bot = GeminiMCPChatBot(session_name=args.session, resume=args.resume)
+    bot.gemini_limiter = TokenBucket(args.gemini_rpm / 60, GEMINI_BURST) if args.gemini_rpm else None
+
+    serve = None
+    if args.requests_file or args.listen:
+        scheduler = RequestScheduler(bot.answer, max_concurrent=args.max_active)
+        if args.requests_file:
+            responses_file = args.responses_file or args.requests_file.with_suffix(".responses.jsonl")
+
+            async def serve():
+                failed = await serve_jsonl_file(scheduler, args.requests_file, responses_file)
+                print(f"\n📬 Answers written to {responses_file} ({failed} failed)")
+        else:
+            host, _, port = args.listen.rpartition(":")
+
+            async def serve():
+                await serve_socket(scheduler, host or "127.0.0.1", int(port))
+
     try:
-        await bot.connect_to_server_and_setup_tools()
+        await bot.connect_to_server_and_setup_tools(serve)
     finally:
         await bot.exit_stack.aclose()
+        if metrics.export_path:
+            metrics.export()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Upper bounds in seconds, roughly log-spaced from 1 ms to 5 minutes.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Recent samples kept per series for percentile estimates.
+RESERVOIR_SIZE = 1024
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def percentile(self, p: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide latency histograms, counters and gauges, labelled Prometheus-style.
+
+    If `export_path` is set, a snapshot is written there at most every
+    `export_interval` seconds while metrics are recorded (and on `export()`).
+    A `.prom` path is rewritten in Prometheus text format; anything else gets
+    one JSON line appended per snapshot.
+    """
+
+    def __init__(self, export_path: Optional[str] = None, export_interval: float = 30.0):
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._lock = threading.Lock()
+        self._last_export = time.monotonic()
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._histograms.setdefault(name, {}).setdefault(key, Histogram()).observe(seconds)
+        self._maybe_export()
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+        self._maybe_export()
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+        self._maybe_export()
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "histograms": {
+                    name: [{"labels": dict(key), **hist.summary()} for key, hist in series.items()]
+                    for name, series in self._histograms.items()
+                },
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                "gauges": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._gauges.items()
+                },
+            }
+
+    def render_text(self) -> str:
+        """Human-readable table for chat output."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in sorted(snapshot["histograms"].items()):
+            lines.append(f"{name}")
+            for entry in sorted(series, key=lambda e: sorted(e["labels"].items())):
+                labels = ", ".join(f"{k}={v}" for k, v in sorted(entry["labels"].items()))
+                lines.append(
+                    f"   {labels or '(all)'}: n={entry['count']} "
+                    f"p50={entry['p50'] * 1000:.1f}ms p95={entry['p95'] * 1000:.1f}ms max={entry['max'] * 1000:.1f}ms"
+                )
+        for name, series in sorted({**snapshot["counters"], **snapshot["gauges"]}.items()):
+            lines.append(f"{name}")
+            for entry in series:
+                labels = ", ".join(f"{k}={v}" for k, v in sorted(entry["labels"].items()))
+                lines.append(f"   {labels or '(all)'}: {entry['value']:g}")
+        return "\n".join(lines) if lines else "No metrics recorded yet."
+
+    def to_prometheus(self) -> str:
+        def fmt_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = list(key) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in series.items():
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.bucket_counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{fmt_labels(key, (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{name}_bucket{fmt_labels(key, (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{name}_sum{fmt_labels(key)} {hist.sum}")
+                    lines.append(f"{name}_count{fmt_labels(key)} {hist.count}")
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{fmt_labels(key)} {value:g}")
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in series.items():
+                    lines.append(f"{name}{fmt_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Optional[str] = None) -> Optional[str]:
+        path = path or self.export_path
+        if not path:
+            return None
+        self._last_export = time.monotonic()
+        if path.endswith(".prom"):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.snapshot()) + "\n")
+        return path
+
+    def _maybe_export(self) -> None:
+        if self.export_path and time.monotonic() - self._last_export >= self.export_interval:
+            try:
+                self.export()
+            except OSError:
+                pass
+
+
+metrics = MetricsRegistry()
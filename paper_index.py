@@ -0,0 +1,78 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class PaperIndex:
+    """
+    Persistent paper ID -> (topic, metadata) index backed by SQLite.
+
+    The per-topic `papers_info.json` files remain the data that the tools
+    write; this index just mirrors them so lookups by paper ID don't have to
+    scan every topic folder.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not self.db_path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS papers (
+                paper_id TEXT PRIMARY KEY,
+                topic TEXT NOT NULL,
+                info TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.is_new = is_new
+
+    def get(self, paper_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT topic, info FROM papers WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        topic, info = row
+        return {"topic": topic, "info": json.loads(info)}
+
+    def upsert(self, topic: str, papers: Dict[str, Dict]) -> None:
+        rows = [(paper_id, topic, json.dumps(info)) for paper_id, info in papers.items()]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO papers (paper_id, topic, info) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def rebuild(self, topics: Iterable[Tuple[str, Dict[str, Dict]]]) -> int:
+        """
+        Drop the index and repopulate it from (topic, papers) pairs, as read
+        from the topic files on disk. Returns the number of indexed papers.
+        """
+        rows = {}
+        for topic, papers in topics:
+            for paper_id, paper_info in papers.items():
+                rows.setdefault(paper_id, (paper_id, topic, json.dumps(paper_info)))
+
+        with self._lock:
+            self._conn.execute("DELETE FROM papers")
+            self._conn.executemany(
+                "INSERT INTO papers (paper_id, topic, info) VALUES (?, ?, ?)",
+                rows.values(),
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
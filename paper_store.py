@@ -0,0 +1,136 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+from filelock import FileLock
+
+from jsonl import iter_records, open_for_append
+from metrics import metrics
+
+
+class PaperStore:
+    """
+    Storage for the per-topic paper metadata under `<base_dir>/<topic>/`.
+
+    Each topic has a `papers_info.json` snapshot plus a `papers_info.log.jsonl`
+    append log. Adding papers appends one line per paper to the log instead of
+    rewriting the snapshot; once the log reaches `compact_every` entries it is
+    folded into a new snapshot, which is written to a temporary file and
+    atomically swapped in. All writes to a topic hold a per-topic file lock,
+    so concurrent writers (threads or processes) can't lose each other's updates.
+    """
+
+    SNAPSHOT = "papers_info.json"
+    LOG = "papers_info.log.jsonl"
+
+    def __init__(self, base_dir, compact_every: int = 100):
+        self.base_dir = Path(base_dir)
+        self.compact_every = compact_every
+
+    def topic_dir(self, topic: str) -> Path:
+        return self.base_dir / topic
+
+    def _lock(self, topic: str) -> FileLock:
+        topic_dir = self.topic_dir(topic)
+        topic_dir.mkdir(parents=True, exist_ok=True)
+        return FileLock(str(topic_dir / ".papers_info.lock"), timeout=30)
+
+    def _read_log(self, topic: str) -> Tuple[Dict[str, Dict], int]:
+        papers = {}
+        count = 0
+        try:
+            with open(self.topic_dir(topic) / self.LOG, encoding="utf-8") as f, \
+                    metrics.timer("json_load_seconds", file="log"):
+                for entry in iter_records(f):
+                    papers[entry["id"]] = entry["info"]
+                    count += 1
+        except FileNotFoundError:
+            pass
+        return papers, count
+
+    def _read(self, topic: str) -> Tuple[Dict[str, Dict], int]:
+        try:
+            with open(self.topic_dir(topic) / self.SNAPSHOT, encoding="utf-8") as f, \
+                    metrics.timer("json_load_seconds", file="snapshot"):
+                papers = json.load(f)
+        except FileNotFoundError:
+            papers = {}
+        logged, count = self._read_log(topic)
+        papers.update(logged)
+        return papers, count
+
+    def read_topic(self, topic: str) -> Dict[str, Dict]:
+        """
+        Return every paper stored for `topic`. Raises json.JSONDecodeError if
+        the snapshot is unreadable; returns {} if the topic doesn't exist.
+        """
+        return self._read(topic)[0]
+
+    def exists(self, topic: str) -> bool:
+        topic_dir = self.topic_dir(topic)
+        return (topic_dir / self.SNAPSHOT).exists() or (topic_dir / self.LOG).exists()
+
+    def version(self, topic: str) -> Tuple:
+        """
+        Cheap change marker for a topic (mtime and size of its files). It
+        changes whenever papers are added or the log is compacted, so it can be
+        used to invalidate anything derived from the topic's data.
+        """
+        version = []
+        for name in (self.SNAPSHOT, self.LOG):
+            try:
+                stat = (self.topic_dir(topic) / name).stat()
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                version.append(None)
+        return tuple(version)
+
+    def topics(self) -> Iterator[str]:
+        if not self.base_dir.is_dir():
+            return
+        for topic_dir in self.base_dir.iterdir():
+            if topic_dir.is_dir() and self.exists(topic_dir.name):
+                yield topic_dir.name
+
+    def add_papers(self, topic: str, papers: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Store the papers not already in `topic`. Returns the ones that were added."""
+        with self._lock(topic):
+            try:
+                existing, logged = self._read(topic)
+            except json.JSONDecodeError:
+                existing, logged = {}, self._read_log(topic)[1]
+            added = {paper_id: info for paper_id, info in papers.items() if paper_id not in existing}
+            if not added:
+                return added
+
+            log_path = self.topic_dir(topic) / self.LOG
+            with open_for_append(log_path) as f, metrics.timer("json_dump_seconds", file="log"):
+                for paper_id, info in added.items():
+                    f.write(json.dumps({"id": paper_id, "info": info}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            if logged + len(added) >= self.compact_every:
+                self._compact(topic)
+        return added
+
+    def compact(self, topic: str) -> None:
+        with self._lock(topic):
+            self._compact(topic)
+
+    def _compact(self, topic: str) -> None:
+        # Caller holds the topic lock.
+        try:
+            papers = self.read_topic(topic)
+        except json.JSONDecodeError:
+            # Don't replace a corrupted snapshot with just the log; leave it for inspection.
+            return
+        topic_dir = self.topic_dir(topic)
+        tmp_path = topic_dir / f"{self.SNAPSHOT}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f, metrics.timer("json_dump_seconds", file="snapshot"):
+            json.dump(papers, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, topic_dir / self.SNAPSHOT)
+        (topic_dir / self.LOG).unlink(missing_ok=True)
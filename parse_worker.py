@@ -0,0 +1,50 @@
+"""
+docling conversion of locally stored PDFs, kept free of server state so the
+same functions can run in the MCP server process or in a worker process pool.
+Downloading is a separate stage (see pdf_store.py), so conversions can run
+while other downloads are still in flight.
+
+Nothing in here prints: worker processes share the server's stdout, which
+carries the stdio MCP protocol.
+
+docling is imported on first use: it pulls in the ML stack and takes seconds
+to load, which sessions that never convert a PDF shouldn't pay for.
+"""
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    from docling.document_converter import DocumentConverter
+
+_converter = None
+_converter_lock = threading.Lock()
+
+
+def get_converter() -> "DocumentConverter":
+    # Building a DocumentConverter loads its models, so keep one for the life of the process.
+    global _converter
+    with _converter_lock:
+        if _converter is None:
+            from docling.document_converter import DocumentConverter
+
+            _converter = DocumentConverter()
+        return _converter
+
+
+def convert_pdf_file(pdf_path) -> str:
+    # docling opens the file itself (pdfium reads it natively), so the PDF is
+    # never copied into a Python buffer.
+    result = get_converter().convert(Path(pdf_path))
+    return result.document.export_to_markdown()
+
+
+def convert_job(pdf_path) -> Tuple[str, float]:
+    """
+    Worker entry point: returns (markdown, seconds spent converting). The
+    timing is handed back to the parent so it lands in the parent's metrics.
+    """
+    started = time.perf_counter()
+    markdown_content = convert_pdf_file(pdf_path)
+    return markdown_content, time.perf_counter() - started
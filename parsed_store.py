@@ -0,0 +1,187 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+# "3 Methods", "3.1. Setup", "IV. RESULTS" -> compared without the numbering.
+NUMBERING_RE = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.)\s+")
+INSTRUCTIONS_FILE = "INSTRUCTIONS.md"
+
+
+def split_sections(markdown: str) -> List[Tuple[str, int, int, int]]:
+    """
+    (heading, level, start, end) for every Markdown heading, as byte offsets
+    into the UTF-8 text. A section runs from its heading line to the next
+    heading of the same or a higher level, so it includes its subsections.
+    Headings inside fenced code blocks are ignored.
+    """
+    headings = []
+    offset = 0
+    in_fence = False
+    for line in markdown.encode("utf-8").splitlines(keepends=True):
+        text = line.decode("utf-8").rstrip("\r\n")
+        if text.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = HEADING_RE.match(text)
+            if match:
+                headings.append((match.group(2).strip(), len(match.group(1)), offset))
+        offset += len(line)
+
+    sections = []
+    for i, (heading, level, start) in enumerate(headings):
+        end = next((later[2] for later in headings[i + 1:] if later[1] <= level), offset)
+        sections.append((heading, level, start, end))
+    return sections
+
+
+def normalize_heading(heading: str) -> str:
+    heading = NUMBERING_RE.sub("", heading.strip().strip("*_").strip())
+    return " ".join(heading.lower().split())
+
+
+class ParsedStore:
+    """
+    Parsed papers as `<parsed_dir>/<title>.md` files holding the title and
+    the converted Markdown, plus a SQLite table of the byte offsets of each
+    file's headings, so single sections can be read by seeking straight to
+    them instead of loading the whole paper.
+
+    The analysis instructions are the same for every paper, so they are
+    written once to `INSTRUCTIONS.md` rather than into each file.
+    """
+
+    def __init__(self, parsed_dir, db_path, instructions: str):
+        self.parsed_dir = Path(parsed_dir)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.instructions = instructions.strip() + "\n"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS parsed_papers (
+                paper_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sections (
+                paper_id TEXT NOT NULL,
+                ordinal INTEGER NOT NULL,
+                heading TEXT NOT NULL,
+                level INTEGER NOT NULL,
+                start INTEGER NOT NULL,
+                end INTEGER NOT NULL,
+                PRIMARY KEY (paper_id, ordinal)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _write_instructions(self) -> None:
+        path = self.parsed_dir / INSTRUCTIONS_FILE
+        try:
+            if path.read_text(encoding="utf-8") == self.instructions:
+                return
+        except FileNotFoundError:
+            pass
+        path.write_text(self.instructions, encoding="utf-8")
+
+    def save(self, paper_id: str, title: str, filename: str, markdown: str) -> Path:
+        """
+        Write a parsed paper and index its sections; returns the file path.
+        A paper saved again with the same content is left as it is.
+        """
+        self.parsed_dir.mkdir(parents=True, exist_ok=True)
+        self._write_instructions()
+        path = self.parsed_dir / filename
+        content = f"# {title}\n\n{markdown}"
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, size, content_hash FROM parsed_papers WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        if row is not None and row[0] == str(path) and row[2] == content_hash:
+            if path.exists() and path.stat().st_size == row[1]:
+                return path
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        # The title line spans the whole file, so only headings below it are sections.
+        sections = [section for section in split_sections(content) if section[2] > 0]
+        with self._lock:
+            self._conn.execute("DELETE FROM sections WHERE paper_id = ?", (paper_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parsed_papers (paper_id, title, path, size, content_hash) VALUES (?, ?, ?, ?, ?)",
+                (paper_id, title, str(path), path.stat().st_size, content_hash),
+            )
+            self._conn.executemany(
+                "INSERT INTO sections (paper_id, ordinal, heading, level, start, end) VALUES (?, ?, ?, ?, ?, ?)",
+                [(paper_id, i, *section) for i, section in enumerate(sections)],
+            )
+            self._conn.commit()
+        return path
+
+    def get(self, paper_id: str) -> Optional[Dict]:
+        """{"title", "path", "size", "sections": [{"heading", "level", "start", "end"}]}, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, path, size FROM parsed_papers WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            sections = self._conn.execute(
+                "SELECT heading, level, start, end FROM sections WHERE paper_id = ? ORDER BY ordinal",
+                (paper_id,),
+            ).fetchall()
+        title, path, size = row
+        path = Path(path)
+        if not path.exists() or path.stat().st_size != size:
+            # Changed or removed since it was indexed; the offsets no longer apply.
+            return None
+        return {
+            "title": title,
+            "path": path,
+            "size": size,
+            "sections": [
+                {"heading": heading, "level": level, "start": start, "end": end}
+                for heading, level, start, end in sections
+            ],
+        }
+
+    def read_sections(self, paper_id: str, names: List[str]) -> Optional[List[Tuple[str, str]]]:
+        """
+        (heading, text) of the sections whose heading contains one of `names`
+        (case-insensitive, ignoring section numbers), in document order. A
+        section nested inside another matched section is not repeated. Returns
+        None if the paper hasn't been parsed.
+        """
+        entry = self.get(paper_id)
+        if entry is None:
+            return None
+        wanted = [normalize_heading(name) for name in names]
+        matched = []
+        covered_until = -1
+        for section in entry["sections"]:
+            heading = normalize_heading(section["heading"])
+            if section["start"] < covered_until or not any(name and name in heading for name in wanted):
+                continue
+            matched.append(section)
+            covered_until = section["end"]
+
+        results = []
+        with open(entry["path"], "rb") as f:
+            for section in matched:
+                f.seek(section["start"])
+                text = f.read(section["end"] - section["start"]).decode("utf-8", errors="replace")
+                results.append((section["heading"], text))
+        return results
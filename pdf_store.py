@@ -0,0 +1,155 @@
+import hashlib
+import mmap
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import httpx
+from filelock import FileLock
+
+from metrics import metrics
+
+CHUNK_SIZE = 256 * 1024
+
+
+def hash_file(path: Path) -> str:
+    """sha256 of a file, read through a memory map rather than into a buffer."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+class PdfStore:
+    """
+    Content-addressed store of downloaded PDFs (`<store_dir>/<sha256>.pdf`),
+    with a SQLite table mapping paper IDs to content hashes.
+
+    Downloads run on a pool of `max_parallel` threads sharing one pooled HTTP
+    client, and a paper already being downloaded is not fetched twice. Bytes
+    are streamed to `partial/<paper_id>.part`; an interrupted download resumes
+    from there with a Range request, and only a complete file is moved into
+    place under its hash, so two IDs for the same PDF share one file. The
+    partial file is guarded by a file lock, since other server processes
+    (one per stdio client) may be downloading the same paper.
+    """
+
+    def __init__(self, store_dir, max_parallel: int = 4, client: Optional[httpx.Client] = None, timeout: float = 60):
+        self.store_dir = Path(store_dir)
+        self.partial_dir = self.store_dir / "partial"
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        self.client = client or httpx.Client(
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_parallel, max_keepalive_connections=max_parallel),
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="pdf-download")
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.store_dir / "pdfs.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pdfs (
+                paper_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                downloaded_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _path(self, content_hash: str) -> Path:
+        return self.store_dir / f"{content_hash}.pdf"
+
+    def get(self, paper_id: str) -> Optional[Tuple[str, Path]]:
+        """(content hash, local path) of a stored PDF, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM pdfs WHERE paper_id = ?", (paper_id,)).fetchone()
+            if row is None:
+                return None
+            path = self._path(row[0])
+            if not path.exists():
+                self._conn.execute("DELETE FROM pdfs WHERE paper_id = ?", (paper_id,))
+                self._conn.commit()
+                return None
+            return row[0], path
+
+    def submit(self, paper_id: str, url: str) -> Future:
+        """Future resolving to (content hash, local path); already stored PDFs resolve immediately."""
+        stored = self.get(paper_id)
+        if stored is not None:
+            metrics.inc("pdf_store_hits_total")
+            future = Future()
+            future.set_result(stored)
+            return future
+        with self._lock:
+            future = self._in_flight.get(paper_id)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._download, paper_id, url)
+            self._in_flight[paper_id] = future
+        # Registered outside the lock: if the download has already finished,
+        # the callback runs right here and takes the lock itself.
+        future.add_done_callback(lambda done: self._forget(paper_id, done))
+        return future
+
+    def fetch(self, paper_id: str, url: str) -> Tuple[str, Path]:
+        """Blocking `submit`: the stored or freshly downloaded PDF."""
+        return self.submit(paper_id, url).result()
+
+    def _forget(self, paper_id: str, future: Future) -> None:
+        with self._lock:
+            if self._in_flight.get(paper_id) is future:
+                del self._in_flight[paper_id]
+
+    def _download(self, paper_id: str, url: str) -> Tuple[str, Path]:
+        safe_id = re.sub(r"[^\w.-]", "_", paper_id)
+        part_path = self.partial_dir / f"{safe_id}.part"
+        with FileLock(str(self.partial_dir / f"{safe_id}.lock")):
+            # Another process may have finished it while we waited for the lock.
+            stored = self.get(paper_id)
+            if stored is not None:
+                return stored
+            return self._download_to(paper_id, url, part_path)
+
+    def _download_to(self, paper_id: str, url: str, part_path: Path) -> Tuple[str, Path]:
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        started = time.perf_counter()
+        with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 416:
+                # Our partial file doesn't match what the server has; start over.
+                part_path.unlink()
+                return self._download_to(paper_id, url, part_path)
+            response.raise_for_status()
+            resumed = offset and response.status_code == 206
+            with open(part_path, "ab" if resumed else "wb") as f:
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+        metrics.observe("pdf_download_seconds", time.perf_counter() - started, resumed=bool(resumed))
+
+        content_hash = hash_file(part_path)
+        path = self._path(content_hash)
+        if path.exists():
+            part_path.unlink()
+        else:
+            os.replace(part_path, path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pdfs (paper_id, content_hash, size, url, downloaded_at) VALUES (?, ?, ?, ?, ?)",
+                (paper_id, content_hash, path.stat().st_size, url, time.time()),
+            )
+            self._conn.commit()
+        return content_hash, path
@@ -0,0 +1,88 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from metrics import metrics
+
+T = TypeVar("T")
+
+# HTTP status codes worth retrying: quota exhausted, and transient server errors.
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Async token-bucket limiter: `rate` tokens per second, holding at most
+    `capacity` so an idle period allows a short burst. Waiters are served
+    in arrival order, so a steady stream of callers can't starve an early one.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """Wait until `tokens` are available and take them; returns the seconds waited."""
+        started = time.monotonic()
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+        return time.monotonic() - started
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)], so retrying clients spread out."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def is_retryable(error: BaseException) -> bool:
+    # google.genai's APIError and httpx's HTTPStatusError both carry a status
+    # code; connection failures and timeouts from httpx are retried as well.
+    code = getattr(error, "code", None)
+    if code is None and getattr(error, "response", None) is not None:
+        code = getattr(error.response, "status_code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS_CODES
+    return type(error).__module__.startswith("httpx") or isinstance(error, (ConnectionError, TimeoutError))
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[T]],
+    limiter: Optional[TokenBucket],
+    retries: int,
+    base: float,
+    cap: float,
+    name: str,
+    can_retry: Callable[[], bool] = lambda: True,
+) -> T:
+    """
+    Run `call()` after taking a token from `limiter`, retrying retryable
+    errors up to `retries` times with jittered exponential backoff. A call that
+    has already had side effects (e.g. streamed part of a response) can veto
+    retrying through `can_retry`. Time spent waiting for the limiter is
+    recorded as `<name>_limiter_wait_seconds`.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            metrics.observe(f"{name}_limiter_wait_seconds", await limiter.acquire())
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == retries or not is_retryable(e) or not can_retry():
+                raise
+            delay = backoff_delay(attempt, base, cap)
+            metrics.inc(f"{name}_retries_total")
+            print(f"\n⏳ {name} call failed ({e}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
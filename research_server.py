@@ -1,190 +1,787 @@
 
-import arxiv
+import argparse
+import asyncio
+import functools
+import heapq
 import json
+import multiprocessing
 import os
-from typing import List
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from urllib.parse import parse_qs
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional
 from mcp.server.fastmcp import FastMCP
 import re
 from pathlib import Path
-from docling.document_converter import DocumentConverter
-from mcp.types import Resource
+from mcp.types import InitializedNotification, Resource, ToolAnnotations
+from paper_index import PaperIndex
+from paper_store import PaperStore
+from conversion_cache import ConversionCache
+from parsed_store import INSTRUCTIONS_FILE, ParsedStore
+from pdf_store import PdfStore
+from search_cache import SearchCache
+from fulltext_index import FullTextIndex, split_passages
+import parse_worker
+from metrics import metrics
+
+if TYPE_CHECKING:
+    import arxiv
+    from vector_store import VectorStore
 
 # --- Constants for directories ---
 PAPER_DIR = "papers"
 PAPER_TXT_DIR = Path("add path here")
 PARSED_DIR = PAPER_TXT_DIR
+PARSED_SECTIONS_PATH = Path(PAPER_DIR) / "parsed_sections.db"
+INDEX_PATH = Path(PAPER_DIR) / "papers_index.db"
+CONVERSION_CACHE_DIR = Path(PAPER_DIR) / "conversion_cache"
+CONVERSION_CACHE_MAX_BYTES = 500 * 1024 * 1024
+PDF_STORE_DIR = Path(PAPER_DIR) / "pdfs"
+PDF_DOWNLOAD_WORKERS = 4
+BATCH_PARSE_WORKERS = os.cpu_count() or 1
+SEARCH_CACHE_PATH = Path(PAPER_DIR) / "search_cache.db"
+FULLTEXT_INDEX_PATH = Path(PAPER_DIR) / "fulltext_index.db"
+VECTOR_STORE_DIR = Path(PAPER_DIR) / "vector_store"
+# Set to a sentence-transformers model name (e.g. "all-MiniLM-L6-v2") to use it
+# instead of the built-in hashing embedder; requires `sentence-transformers`.
+EMBEDDING_MODEL = None
+EMBEDDING_DIM = 384
+TOPIC_PAGE_SIZE = 20
+PARSED_LIST_PAGE_SIZE = 100
+SEARCH_CACHE_TTL = 6 * 60 * 60
+SEARCH_CACHE_STALE_TTL = 7 * 24 * 60 * 60
+# refresh_topic looks at most this many of the newest arXiv results per topic.
+REFRESH_POOL_SIZE = 200
+# Optional metrics export file: `.prom` for Prometheus text format, anything else for JSONL snapshots.
+METRICS_EXPORT_PATH = os.getenv("RESEARCH_METRICS_EXPORT")
+metrics.export_path = METRICS_EXPORT_PATH
+# Blocking tools run on a shared pool of this many threads, across all sessions.
+MAX_CONCURRENT_TOOL_CALLS = 8
+# Calls running or waiting beyond this are rejected with a "busy" error.
+MAX_QUEUED_TOOL_CALLS = 64
+DEFAULT_HTTP_HOST = "127.0.0.1"
+DEFAULT_HTTP_PORT = 8001
+# Tool hints for clients: read-only and idempotent tools are safe to call
+# again after a dropped connection.
+READ_ONLY = ToolAnnotations(readOnlyHint=True)
+IDEMPOTENT = ToolAnnotations(idempotentHint=True)
+
+INSTRUCTION_TEXT = """
+You are a research assistant with expertise in summarizing and critically evaluating academic papers. Carefully read the research paper provided and structure your analysis in the following clear, concise, and thorough manner:
+
+Overall Summary:
+Provide a brief, high-level summary capturing the main purpose and significance of the paper.
+
+Goal of the Paper:
+Clearly state the primary research question or objective that the authors aimed to address.
+
+Methods:
+Summarize the methodology clearly, detailing the experimental design, data collection techniques, analytical approaches, and computational methods used by the authors.
+
+Results:
+Highlight the key findings and outcomes presented in the paper, focusing on the data-supported conclusions and significant experimental results.
+
+Novelty of the Research:
+Discuss explicitly what makes this research innovative or unique compared to existing studies. Clarify any groundbreaking methods, insights, or conclusions introduced.
+
+Future Research Implications:
+Suggest potential avenues for future research that stem from the findings of this paper. Describe clearly how the current results can guide or inform subsequent studies.
+
+Relevance to Current Research:
+Contextualize how this research fits into the broader landscape of the field. Explain its alignment or deviation from current trends, theories, and practices.
+
+Limitations:
+Clearly outline any limitations identified in the paper, such as methodological constraints, potential biases, assumptions, or gaps in the research approach that could impact the validity or generalizability of the findings.
+
+Provide each section distinctly and ensure your analysis is clear, insightful, and comprehensive.
+
+I will now paste the text of the research paper below.
+"""
+
+# Heavy dependencies (arxiv, numpy via vector_store, docling via parse_worker)
+# are imported by the first tool that needs them, so the server answers the
+# handshake and cheap requests without loading them. With --prewarm they are
+# loaded on a background thread once the handshake has finished instead.
 
 # Initialize FastMCP server
 mcp = FastMCP("research", dynamic_resource_resolver=True)
 
+# Shared singletons are created on first use. Tool calls run on worker
+# threads, so each has its own lock, taken only while it is being created:
+# building one (e.g. backfilling the vector store) doesn't stall tools that
+# only need another, and once created they are returned without locking.
+_paper_store = None
+_paper_store_lock = threading.Lock()
+_paper_index = None
+_paper_index_lock = threading.Lock()
+
+
+def get_paper_store() -> PaperStore:
+    global _paper_store
+    if _paper_store is None:
+        with _paper_store_lock:
+            if _paper_store is None:
+                _paper_store = PaperStore(PAPER_DIR)
+    return _paper_store
+
+
+def _stored_topics():
+    store = get_paper_store()
+    for topic in store.topics():
+        try:
+            yield topic, store.read_topic(topic)
+        except json.JSONDecodeError:
+            continue
+
+
+def get_paper_index() -> PaperIndex:
+    global _paper_index
+    if _paper_index is None:
+        with _paper_index_lock:
+            if _paper_index is None:
+                index = PaperIndex(INDEX_PATH)
+                if index.is_new:
+                    count = index.rebuild(_stored_topics())
+                    print(f"Built paper index with {count} papers.", file=sys.stderr)
+                _paper_index = index
+    return _paper_index
+
+
+_conversion_cache = None
+_conversion_cache_lock = threading.Lock()
+
+
+def get_conversion_cache() -> ConversionCache:
+    global _conversion_cache
+    if _conversion_cache is None:
+        with _conversion_cache_lock:
+            if _conversion_cache is None:
+                _conversion_cache = ConversionCache(CONVERSION_CACHE_DIR, CONVERSION_CACHE_MAX_BYTES)
+    return _conversion_cache
+
+
+_pdf_store = None
+_pdf_store_lock = threading.Lock()
+
+
+def get_pdf_store() -> PdfStore:
+    global _pdf_store
+    if _pdf_store is None:
+        with _pdf_store_lock:
+            if _pdf_store is None:
+                _pdf_store = PdfStore(PDF_STORE_DIR, max_parallel=PDF_DOWNLOAD_WORKERS)
+    return _pdf_store
+
+
+_fulltext_index = None
+_fulltext_index_lock = threading.Lock()
+_vector_store = None
+_vector_store_lock = threading.Lock()
+
+
+def _iter_paper_texts():
+    """(paper_id, kind, title, text) for every stored summary and cached conversion."""
+    for _, papers in _stored_topics():
+        for paper_id, info in papers.items():
+            yield paper_id, "summary", info.get('title', ''), info.get('summary', '')
+    cache = get_conversion_cache()
+    for paper_id in cache.paper_ids():
+        entry = get_paper_index().get(paper_id)
+        markdown_content = cache.get(paper_id)
+        if entry is not None and markdown_content is not None:
+            yield paper_id, "parsed", entry["info"].get('title', ''), markdown_content
+
+
+def get_fulltext_index() -> FullTextIndex:
+    global _fulltext_index
+    if _fulltext_index is None:
+        with _fulltext_index_lock:
+            if _fulltext_index is None:
+                index = FullTextIndex(FULLTEXT_INDEX_PATH)
+                if index.is_new:
+                    # Backfill from what is already on disk; from here on it is updated as papers are written.
+                    print("Building full-text index...", file=sys.stderr)
+                    for paper_id, kind, title, text in _iter_paper_texts():
+                        index.index(paper_id, kind, title, text)
+                _fulltext_index = index
+    return _fulltext_index
+
+
+def get_embedder():
+    from vector_store import HashingEmbedder, sentence_transformer_embedder
+
+    if EMBEDDING_MODEL:
+        return sentence_transformer_embedder(EMBEDDING_MODEL)
+    return HashingEmbedder(EMBEDDING_DIM)
+
+
+def get_vector_store() -> "VectorStore":
+    global _vector_store
+    if _vector_store is None:
+        with _vector_store_lock:
+            if _vector_store is None:
+                from vector_store import VectorStore
+
+                embedder = get_embedder()
+                store = VectorStore(VECTOR_STORE_DIR, embedder, embedder.dim)
+                if store.is_new:
+                    print("Building vector store...", file=sys.stderr)
+                    for paper_id, kind, title, text in _iter_paper_texts():
+                        store.add(paper_id, kind, title, split_passages(text))
+                _vector_store = store
+    return _vector_store
+
+
+def index_paper_text(paper_id: str, kind: str, title: str, text: str) -> None:
+    """Keep the full-text index and the vector store in step with what was just written."""
+    get_fulltext_index().index(paper_id, kind, title, text)
+    get_vector_store().add(paper_id, kind, title, split_passages(text))
+
+
+_arxiv_client = None
+_arxiv_client_lock = threading.Lock()
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_arxiv_client() -> "arxiv.Client":
+    global _arxiv_client
+    if _arxiv_client is None:
+        with _arxiv_client_lock:
+            if _arxiv_client is None:
+                import arxiv
+
+                _arxiv_client = arxiv.Client()
+    return _arxiv_client
+
+
+def stream_arxiv(query: str, pool_size: int, newest_first: bool = False) -> Iterator[dict]:
+    """
+    Yield up to `pool_size` search results as paper dicts, by relevance or
+    newest first. The arXiv client requests one page at a time as the
+    generator is consumed, so a caller that stops early skips the remaining pages.
+    """
+    import arxiv
 
-@mcp.tool()
-def search_papers(topic: str, max_results: int = 1, search_pool_size: int = 50) -> str:
-    client = arxiv.Client()
-    print(f"Fetching {search_pool_size} most relevant papers for '{topic}'...")
     search = arxiv.Search(
-        query=topic,
-        max_results=search_pool_size,
-        sort_by=arxiv.SortCriterion.Relevance
+        query=query,
+        max_results=pool_size,
+        sort_by=arxiv.SortCriterion.SubmittedDate if newest_first else arxiv.SortCriterion.Relevance,
+        sort_order=arxiv.SortOrder.Descending
     )
-    relevant_papers = list(client.results(search))
-    if not relevant_papers:
-        return f"No papers found for the topic '{topic}'."
+    for paper in get_arxiv_client().results(search):
+        yield {
+            'short_id': paper.get_short_id(),
+            'title': paper.title,
+            'authors': [author.name for author in paper.authors],
+            'summary': paper.summary.replace("\n", " "),
+            'pdf_url': paper.pdf_url,
+            'published': paper.published.isoformat()
+        }
+
+
+def newest(papers: Iterable[dict], top_k: int) -> List[dict]:
+    """The `top_k` most recently published papers, newest first, holding only `top_k` in memory."""
+    heap = []
+    for order, paper in enumerate(papers):
+        # `order` breaks ties between equal dates without comparing the dicts.
+        item = (paper['published'], -order, paper)
+        if len(heap) < top_k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return [paper for _, _, paper in sorted(heap, reverse=True)]
+
+
+def fetch_arxiv(query: str, pool_size: int, top_k: int) -> List[dict]:
+    print(f"Fetching {pool_size} most relevant papers for '{query}'...", file=sys.stderr)
+    with metrics.timer("arxiv_fetch_seconds", mode="search"):
+        return newest(stream_arxiv(query, pool_size), top_k)
+
+
+def harvest_new_papers(query: str, known_ids: set, since: Optional[str], limit: int) -> List[dict]:
+    """
+    Papers for `query` that aren't in `known_ids`, walking the results newest
+    first and stopping at the first one published before `since` (an ISO
+    date) or already known, since everything after it is older still.
+    """
+    new_papers = []
+    with metrics.timer("arxiv_fetch_seconds", mode="refresh"):
+        for paper in stream_arxiv(query, REFRESH_POOL_SIZE, newest_first=True):
+            if paper['short_id'] in known_ids:
+                break
+            if since and paper['published'][:10] < since:
+                break
+            new_papers.append(paper)
+            if len(new_papers) >= limit:
+                break
+    return new_papers
+
+
+def get_search_cache() -> SearchCache:
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = SearchCache(
+                    SEARCH_CACHE_PATH,
+                    # Looked up at call time so a stub can be swapped in for fetch_arxiv.
+                    fetch=lambda query, pool_size, top_k: fetch_arxiv(query, pool_size, top_k),
+                    ttl=SEARCH_CACHE_TTL,
+                    stale_ttl=SEARCH_CACHE_STALE_TTL
+                )
+    return _search_cache
+
+
+def topic_slug(topic: str) -> str:
+    return re.sub(r'[^\w\-_. ]', '_', topic.lower().strip().replace(" ", "_"))
+
+
+def convert_pdf(paper_id: str, pdf_url: str) -> str:
+    cache = get_conversion_cache()
+    markdown_content = cache.get(paper_id)
+    if markdown_content is not None:
+        print(f"Using cached conversion for {paper_id}", file=sys.stderr)
+        return markdown_content
+
+    print(f"Fetching PDF from: {pdf_url}", file=sys.stderr)
+    content_hash, pdf_path = get_pdf_store().fetch(paper_id, pdf_url)
+
+    markdown_content = cache.get_by_hash(content_hash)
+    if markdown_content is None:
+        print(f"Attempting to parse PDF for {paper_id}", file=sys.stderr)
+        with metrics.timer("docling_convert_seconds", mode="inline"):
+            markdown_content = parse_worker.convert_pdf_file(pdf_path)
+
+    cache.put(paper_id, content_hash, markdown_content)
+    return markdown_content
+
+
+_parsed_store = None
+_parsed_store_lock = threading.Lock()
+
+
+def get_parsed_store() -> ParsedStore:
+    global _parsed_store
+    if _parsed_store is None:
+        with _parsed_store_lock:
+            if _parsed_store is None:
+                _parsed_store = ParsedStore(PARSED_DIR, PARSED_SECTIONS_PATH, INSTRUCTION_TEXT)
+    return _parsed_store
+
+
+def save_parsed_paper(paper_id: str, paper_title: str, markdown_content: str) -> str:
+    safe_title = re.sub(r'[^\w\-_]', '_', paper_title.strip())
+    safe_title = re.sub(r'_+', '_', safe_title).strip('_')
+    safe_title = safe_title[:150]
+
+    output_filepath = get_parsed_store().save(paper_id, paper_title, f"{safe_title}.md", markdown_content)
+
+    index_paper_text(paper_id, "parsed", paper_title, markdown_content)
+    return str(output_filepath)
+
+
+# --- Background batch parsing ---
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+_parse_jobs = {}
+_parse_jobs_lock = threading.Lock()
 
-    print("Sorting relevant papers by most recent date...")
-    relevant_papers.sort(key=lambda paper: paper.published, reverse=True)
-    final_papers = relevant_papers[:max_results]
 
-    safe_topic = re.sub(r'[^\w\-_. ]', '_', topic.lower().strip().replace(" ", "_"))
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                # spawn rather than fork: docling/torch don't survive forking a threaded process.
+                _parse_pool = ProcessPoolExecutor(
+                    max_workers=BATCH_PARSE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _parse_pool
 
-    # Save to internal paper dir
-    paper_dir_path = os.path.join(PAPER_DIR, safe_topic)
-    os.makedirs(paper_dir_path, exist_ok=True)
-    file_path = os.path.join(paper_dir_path, "papers_info.json")
 
-    # Also save to parsed dir
-    parsed_topic_path = os.path.join(PAPER_TXT_DIR, safe_topic)
-    os.makedirs(parsed_topic_path, exist_ok=True)
-    parsed_file_path = os.path.join(parsed_topic_path, "papers_info.json")
+def _discard_parse_pool(pool: ProcessPoolExecutor) -> None:
+    # A pool whose worker died (e.g. OOM-killed by docling) rejects all further
+    # work; drop it so the next conversion starts a fresh one.
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            _parse_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
 
+
+def _finish_paper(job_id: str, paper_id: str, status: str, message: str) -> None:
+    with _parse_jobs_lock:
+        job = _parse_jobs[job_id]
+        job["results"][paper_id] = {"status": status, "message": message}
+        job["done"] += 1
+
+
+def _on_pdf_downloaded(job_id: str, paper_id: str, paper_title: str, future) -> None:
+    # Runs on a download thread: hand the local file to the conversion pool
+    # while the remaining downloads keep going.
     try:
-        with open(file_path, "r") as json_file:
-            papers_info = json.load(json_file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        papers_info = {}
+        content_hash, pdf_path = future.result()
+    except Exception as e:
+        _finish_paper(job_id, paper_id, "failed", f"Download failed: {e}")
+        return
+
+    markdown_content = get_conversion_cache().get_by_hash(content_hash)
+    if markdown_content is not None:
+        # Same PDF already converted under another paper ID.
+        _store_conversion(job_id, paper_id, paper_title, content_hash, markdown_content)
+        return
+
+    with _parse_jobs_lock:
+        _parse_jobs[job_id]["results"][paper_id] = {"status": "converting", "message": ""}
+    # This runs as a future callback, where an exception would just be logged
+    # and the paper left "converting" forever.
+    pool = get_parse_pool()
+    try:
+        convert_future = pool.submit(parse_worker.convert_job, str(pdf_path))
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            _discard_parse_pool(pool)
+        _finish_paper(job_id, paper_id, "failed", f"Could not start conversion: {e}")
+        return
+    convert_future.add_done_callback(
+        lambda f: _on_paper_converted(job_id, paper_id, paper_title, content_hash, f, pool)
+    )
 
+
+def _on_paper_converted(job_id: str, paper_id: str, paper_title: str, content_hash: str, future, pool) -> None:
+    try:
+        markdown_content, convert_seconds = future.result()
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            _discard_parse_pool(pool)
+        _finish_paper(job_id, paper_id, "failed", str(e))
+        return
+    metrics.observe("docling_convert_seconds", convert_seconds, mode="batch")
+    _store_conversion(job_id, paper_id, paper_title, content_hash, markdown_content)
+
+
+def _store_conversion(job_id: str, paper_id: str, paper_title: str, content_hash: str, markdown_content: str) -> None:
     try:
-        with open(parsed_file_path, "r") as parsed_file:
-            parsed_info = json.load(parsed_file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        parsed_info = {}
+        get_conversion_cache().put(paper_id, content_hash, markdown_content)
+        output_filepath = save_parsed_paper(paper_id, paper_title, markdown_content)
+    except Exception as e:
+        _finish_paper(job_id, paper_id, "failed", str(e))
+        return
+    _finish_paper(job_id, paper_id, "parsed", output_filepath)
+
+
+# --- Bounded tool execution ---
+_tool_executor = None
+_tool_executor_lock = threading.Lock()
+_queued_tool_calls = 0
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    global _tool_executor
+    if _tool_executor is None:
+        with _tool_executor_lock:
+            if _tool_executor is None:
+                _tool_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_TOOL_CALLS, thread_name_prefix="tool")
+    return _tool_executor
+
+
+def offload(func):
+    """
+    Run a blocking tool on the shared tool thread pool instead of the event
+    loop, so a slow call (a PDF conversion) doesn't stall every other session.
+    Once MAX_QUEUED_TOOL_CALLS calls are running or waiting, new calls fail
+    immediately and the client can retry, rather than queueing without bound.
+    """
+    def timed_call(queued_at, args, kwargs):
+        metrics.observe("tool_queue_wait_seconds", time.perf_counter() - queued_at, tool=func.__name__)
+        return func(*args, **kwargs)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        global _queued_tool_calls
+        if _queued_tool_calls >= MAX_QUEUED_TOOL_CALLS:
+            metrics.inc("tool_calls_rejected_total", tool=func.__name__)
+            raise RuntimeError(f"Server busy ({_queued_tool_calls} tool calls in progress); retry shortly.")
+        _queued_tool_calls += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                get_tool_executor(), timed_call, time.perf_counter(), args, kwargs
+            )
+        finally:
+            _queued_tool_calls -= 1
+
+    return wrapper
+
+
+@mcp.tool(annotations=IDEMPOTENT)
+@offload
+def search_papers(topic: str, max_results: int = 1, search_pool_size: int = 50) -> str:
+    # The pool is streamed page by page and only the newest max_results are kept.
+    relevant_papers = get_search_cache().get(topic, search_pool_size, max_results)
+    if not relevant_papers:
+        return f"No papers found for the topic '{topic}'."
+
+    return "\n\n".join(store_topic_papers(topic_slug(topic), relevant_papers))
 
+
+def store_topic_papers(safe_topic: str, papers: List[dict]) -> List[str]:
+    """Add search results to a topic and the indexes; returns one summary line per paper."""
     output_results = []
-    for paper in final_papers:
-        short_id = paper.get_short_id()
-        if short_id not in papers_info:
-            paper_info = {
-                'title': paper.title,
-                'authors': [author.name for author in paper.authors],
-                'summary': paper.summary.replace("\n", " "),
-                'pdf_url': paper.pdf_url,
-                'published': str(paper.published.date())
-            }
-            papers_info[short_id] = paper_info
-            parsed_info[short_id] = paper_info
+    candidates = {}
+    for paper in papers:
+        short_id = paper['short_id']
+        published = paper['published'][:10]
+        candidates[short_id] = {
+            'title': paper['title'],
+            'authors': paper['authors'],
+            'summary': paper['summary'],
+            'pdf_url': paper['pdf_url'],
+            'published': published
+        }
 
         output_entry = (
-            f"Title: {paper.title}, Paper ID: {short_id}\n"
-            f"Published: {paper.published.date()}"
+            f"Title: {paper['title']}, Paper ID: {short_id}\n"
+            f"Published: {published}"
         )
         output_results.append(output_entry)
 
-    with open(file_path, "w") as json_file:
-        json.dump(papers_info, json_file, indent=4)
+    # Only papers the topic doesn't have yet are appended; existing entries are left untouched.
+    new_papers = get_paper_store().add_papers(safe_topic, candidates)
+    get_paper_index().upsert(safe_topic, new_papers)
+    for short_id, paper_info in new_papers.items():
+        index_paper_text(short_id, "summary", paper_info['title'], paper_info['summary'])
 
-    with open(parsed_file_path, "w") as parsed_file:
-        json.dump(parsed_info, parsed_file, indent=4)
+    return output_results
 
-    return "\n\n".join(output_results)
 
-@mcp.tool()
+def refresh_one_topic(safe_topic: str, max_new: int) -> str:
+    try:
+        stored = get_paper_store().read_topic(safe_topic)
+    except json.JSONDecodeError:
+        stored = {}
+    # Stored dates are days, so papers from the newest stored day are looked at
+    # again; the known-ID check is what keeps them from being added twice.
+    since = max((info['published'] for info in stored.values()), default=None)
+    new_papers = harvest_new_papers(safe_topic.replace("_", " "), set(stored), since, max_new)
+    metrics.inc("topic_refresh_new_papers_total", len(new_papers))
+    if not new_papers:
+        return f"{safe_topic}: no new papers since {since or 'the last harvest'}."
+    lines = store_topic_papers(safe_topic, new_papers)
+    return f"{safe_topic}: {len(new_papers)} new paper(s)\n\n" + "\n\n".join(lines)
+
+
+def refresh_topics(topic: str = "", max_new: int = 20) -> str:
+    topics = [topic_slug(topic)] if topic else sorted(get_paper_store().topics())
+    if not topics:
+        return "No stored topics to refresh. Please run `search_papers` first."
+    return "\n\n".join(refresh_one_topic(safe_topic, max_new) for safe_topic in topics)
+
+@mcp.tool(annotations=IDEMPOTENT)
+@offload
+def refresh_topic(topic: str = "", max_new: int = 20) -> str:
+    """Fetch only the papers published since a topic's last harvest and add them to it, newest first. Leave topic empty to refresh every stored topic; meant to be called on a schedule."""
+    return refresh_topics(topic, max_new)
+
+
+@mcp.tool(annotations=READ_ONLY)
+@offload
 def extract_info(paper_id: str) -> str:
-    search_dirs = [Path(PAPER_DIR), Path(PAPER_TXT_DIR)]
+    entry = get_paper_index().get(paper_id)
+    if entry is not None:
+        return json.dumps(entry["info"], indent=2)
 
-    for base_dir in search_dirs:
-        for dir_ in base_dir.iterdir():
-            file_path = dir_ / "papers_info.json"
-            if file_path.is_file():
-                try:
-                    with open(file_path) as f:
-                        info = json.load(f)
-                    if paper_id in info:
-                        return json.dumps(info[paper_id], indent=2)
-                except json.JSONDecodeError:
-                    continue
+    # Raised rather than returned so the client sees an error result: clients
+    # that cache this tool must not keep serving the miss once the paper is stored.
+    raise ValueError(f"No information stored for paper ID {paper_id!r}. Run `search_papers` first.")
 
-    return f"No information stored for paper ID {paper_id!r}."
 
+@mcp.tool(annotations=READ_ONLY)
+@offload
+def search_paper_text(query: str, limit: int = 5) -> str:
+    """Full-text search over stored paper summaries and parsed paper text. Returns the best-matching passages with their paper IDs, so only the relevant parts of a paper need to be read."""
+    results = get_fulltext_index().search(query, limit)
+    if not results:
+        return f"No passages found for {query!r}."
 
-@mcp.tool()
-def file_parsing(paper_id: str) -> str:
-    INSTRUCTION_TEXT = """
-You are a research assistant with expertise in summarizing and critically evaluating academic papers. Carefully read the research paper provided and structure your analysis in the following clear, concise, and thorough manner:
-
-Overall Summary:
-Provide a brief, high-level summary capturing the main purpose and significance of the paper.
-
-Goal of the Paper:
-Clearly state the primary research question or objective that the authors aimed to address.
-
-Methods:
-Summarize the methodology clearly, detailing the experimental design, data collection techniques, analytical approaches, and computational methods used by the authors.
-
-Results:
-Highlight the key findings and outcomes presented in the paper, focusing on the data-supported conclusions and significant experimental results.
+    output_results = []
+    for rank, result in enumerate(results, start=1):
+        output_results.append(
+            f"[{rank}] Paper ID: {result['paper_id']} ({result['kind']}), Title: {result['title']}\n"
+            f"{result['passage']}"
+        )
+    return "\n\n---\n\n".join(output_results)
 
-Novelty of the Research:
-Discuss explicitly what makes this research innovative or unique compared to existing studies. Clarify any groundbreaking methods, insights, or conclusions introduced.
 
-Future Research Implications:
-Suggest potential avenues for future research that stem from the findings of this paper. Describe clearly how the current results can guide or inform subsequent studies.
+@mcp.tool(annotations=READ_ONLY)
+@offload
+def semantic_search_papers(query: str, limit: int = 5) -> str:
+    """Semantic search over stored paper summaries and parsed paper chunks using local embeddings. Returns the closest chunks with their paper IDs and similarity scores."""
+    results = get_vector_store().search(query, limit)
+    if not results:
+        return f"No stored papers match {query!r}."
 
-Relevance to Current Research:
-Contextualize how this research fits into the broader landscape of the field. Explain its alignment or deviation from current trends, theories, and practices.
+    output_results = []
+    for rank, result in enumerate(results, start=1):
+        output_results.append(
+            f"[{rank}] Paper ID: {result['paper_id']} ({result['kind']}), Title: {result['title']}, "
+            f"Score: {result['score']:.3f}\n"
+            f"{result['text']}"
+        )
+    return "\n\n---\n\n".join(output_results)
 
-Limitations:
-Clearly outline any limitations identified in the paper, such as methodological constraints, potential biases, assumptions, or gaps in the research approach that could impact the validity or generalizability of the findings.
 
-Provide each section distinctly and ensure your analysis is clear, insightful, and comprehensive.
+@mcp.tool(annotations=IDEMPOTENT)
+@offload
+def rebuild_paper_index() -> str:
+    """Rebuild the paper ID index from the stored papers_info files on disk."""
+    count = get_paper_index().rebuild(_stored_topics())
+    return f"Rebuilt paper index with {count} papers."
 
-I will now paste the text of the research paper below.
-"""
 
+@mcp.tool(annotations=IDEMPOTENT)
+@offload
+def file_parsing(paper_id: str) -> str:
     pdf_url = None
     paper_title = None
 
-    for dir_ in Path(PAPER_DIR).iterdir():
-        if not dir_.is_dir():
-            continue
-        file_path = dir_ / "papers_info.json"
-        if file_path.is_file():
-            try:
-                with open(file_path) as f:
-                    info = json.load(f)
-                if paper_id in info:
-                    paper_info_dict = info[paper_id]
-                    pdf_url = paper_info_dict.get('pdf_url')
-                    paper_title = paper_info_dict.get('title')
-                    break
-            except (FileNotFoundError, json.JSONDecodeError):
-                continue
+    entry = get_paper_index().get(paper_id)
+    if entry is not None:
+        pdf_url = entry["info"].get('pdf_url')
+        paper_title = entry["info"].get('title')
 
     if not pdf_url or not paper_title:
         return f"Could not find complete information (URL and Title) for paper ID {paper_id}. Please run `search_papers` first."
 
     try:
-        print(f"Attempting to parse PDF from: {pdf_url}")
-        converter = DocumentConverter()
-        result = converter.convert(pdf_url)
-        markdown_content = result.document.export_to_markdown()
+        markdown_content = convert_pdf(paper_id, pdf_url)
     except Exception as e:
         return f"Failed to parse the document for paper ID {paper_id}. Error: {e}"
 
-    # Step 3: Sanitize title
-    safe_title = re.sub(r'[^\w\-_]', '_', paper_title.strip())
-    safe_title = re.sub(r'_+', '_', safe_title).strip('_')
-    safe_title = safe_title[:150]
+    output_filepath = save_parsed_paper(paper_id, paper_title, markdown_content)
+
+    return f"Successfully parsed paper {paper_id} and saved markdown to '{output_filepath}'. Use read_paper_sections to read parts of it."
+
+
+@mcp.tool(annotations=READ_ONLY)
+@offload
+def read_paper_sections(paper_id: str, sections: List[str] = []) -> str:
+    """Read only the named sections of a parsed paper (e.g. ["Methods", "Results"]); matching ignores case and section numbers. Without section names, returns the paper's outline with the size of each section."""
+    entry = get_parsed_store().get(paper_id)
+    if entry is None:
+        return f"Paper {paper_id} hasn't been parsed yet. Please run `file_parsing` first."
+
+    top_level = min((section["level"] for section in entry["sections"]), default=1)
+    outline = "\n".join(
+        f"{'  ' * (section['level'] - top_level)}- {section['heading']} ({section['end'] - section['start']} bytes)"
+        for section in entry["sections"]
+    )
+    if not sections:
+        return f"# {entry['title']}\n\nSections:\n{outline}"
+
+    found = get_parsed_store().read_sections(paper_id, sections)
+    if not found:
+        return f"No sections matching {sections} in paper {paper_id}. Available sections:\n{outline}"
+    return "\n\n".join(text.strip() for _, text in found)
+
+
+
+@mcp.tool()
+@offload
+def parse_papers_batch(paper_ids: List[str] = [], topic: str = "") -> str:
+    """Queue many papers for PDF parsing in the background, given explicit paper IDs and/or a topic whose stored papers should all be parsed. Returns a job ID right away; use get_parse_job to follow progress."""
+    ids = list(paper_ids)
+    if topic:
+        try:
+            topic_papers = get_paper_store().read_topic(topic_slug(topic))
+        except json.JSONDecodeError:
+            topic_papers = {}
+        if not topic_papers:
+            return f"No stored papers for topic '{topic}'. Please run `search_papers` first."
+        ids.extend(topic_papers.keys())
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return "No paper IDs given."
+
+    job_id = uuid.uuid4().hex[:8]
+    with _parse_jobs_lock:
+        _parse_jobs[job_id] = {"total": len(ids), "done": 0, "results": {}}
+
+    cache = get_conversion_cache()
+    index = get_paper_index()
+    for paper_id in ids:
+        entry = index.get(paper_id)
+        pdf_url = entry["info"].get("pdf_url") if entry else None
+        paper_title = entry["info"].get("title") if entry else None
+        if not pdf_url or not paper_title:
+            _finish_paper(job_id, paper_id, "failed", "No stored URL and title; run `search_papers` first.")
+            continue
+
+        markdown_content = cache.get(paper_id)
+        if markdown_content is not None:
+            _finish_paper(job_id, paper_id, "parsed", save_parsed_paper(paper_id, paper_title, markdown_content))
+            continue
+
+        with _parse_jobs_lock:
+            _parse_jobs[job_id]["results"][paper_id] = {"status": "downloading", "message": ""}
+        future = get_pdf_store().submit(paper_id, pdf_url)
+        future.add_done_callback(
+            lambda f, paper_id=paper_id, paper_title=paper_title: _on_pdf_downloaded(job_id, paper_id, paper_title, f)
+        )
+
+    return (
+        f"Started parse job {job_id} for {len(ids)} paper(s): up to {PDF_DOWNLOAD_WORKERS} parallel downloads "
+        f"feeding {BATCH_PARSE_WORKERS} conversion workers."
+    )
 
-    os.makedirs(PARSED_DIR, exist_ok=True)
-    output_filename = f"{safe_title}.txt"
-    output_filepath = os.path.join(PARSED_DIR, output_filename)
 
-    with open(output_filepath, 'w', encoding='utf-8') as file:
-        file.write(f"# {paper_title}\n\n" + INSTRUCTION_TEXT.strip() + "\n\n" + markdown_content)
+@mcp.tool(annotations=READ_ONLY)
+def get_parse_job(job_id: str) -> str:
+    """Report progress and per-paper results of a parse_papers_batch job."""
+    with _parse_jobs_lock:
+        job = _parse_jobs.get(job_id)
+        if job is None:
+            return f"No parse job with ID {job_id!r}."
+        job = json.loads(json.dumps(job))
 
-    return f"Successfully parsed paper {paper_id} and saved markdown to '{output_filepath}'."
+    job["status"] = "finished" if job["done"] == job["total"] else "running"
+    return json.dumps(job, indent=2)
 
 
+@mcp.tool(annotations=IDEMPOTENT)
+def search_cache_stats(clear: bool = False) -> str:
+    """Show hit/miss counters of the arXiv search cache. Pass clear=True to also empty the cache."""
+    cache = get_search_cache()
+    stats = dict(cache.stats)
+    if clear:
+        stats["cleared_entries"] = cache.clear()
+    return json.dumps(stats, indent=2)
+
+
+@mcp.tool(annotations=IDEMPOTENT)
+def server_metrics(export: bool = False) -> str:
+    """Show latency histograms (p50/p95/max) recorded by the research server. Pass export=True to also write them to the configured metrics file."""
+    text = metrics.render_text()
+    if export:
+        path = metrics.export()
+        text += f"\n\nExported to {path}." if path else "\n\nNo export file configured (set RESEARCH_METRICS_EXPORT)."
+    return text
+
+
+@mcp.tool(annotations=IDEMPOTENT)
+@offload
+def clear_conversion_cache(paper_id: str = "") -> str:
+    """Remove a paper's cached PDF conversion so the next file_parsing call converts it again. Clears the whole cache if no paper ID is given."""
+    removed = get_conversion_cache().invalidate(paper_id or None)
+    target = f"paper {paper_id}" if paper_id else "all papers"
+    return f"Removed {removed} cached conversion(s) for {target}."
+
 
 @mcp.prompt()
 def extract_website(url: str, filename: str) -> str:
@@ -219,83 +816,232 @@ def generate_search_prompt(topic: str, num_papers: int = 5) -> str:
     Please present both detailed information about each paper and a high-level synthesis of the research landscape in {topic}."""
 
 
-@mcp.resource("papers://paper")
-def list_parsed_papers() -> str:
-    """
-    Lists all .txt files from the parsed papers folder in markdown bullet list format.
-    """
-    if not PAPER_TXT_DIR.exists():
-        return "⚠️ Parsed directory not found."
+def _parse_page(query: str) -> int:
+    try:
+        page = int(parse_qs(query).get("page", ["1"])[0])
+    except ValueError:
+        page = 1
+    return max(page, 1)
+
+
+def _page_footer(uri: str, page: int, total_pages: int) -> str:
+    footer = f"_Page {page} of {total_pages}._"
+    if page < total_pages:
+        footer += f" Next page: `{uri}?page={page + 1}`"
+    return footer
+
+
+@lru_cache(maxsize=8)
+def _parsed_filenames(mtime_ns: int) -> List[str]:
+    # Keyed by the directory mtime, which changes whenever a file is added or removed.
+    # .md files are written by file_parsing; .txt files by earlier versions.
+    return sorted(
+        f.name for pattern in ("*.md", "*.txt") for f in PAPER_TXT_DIR.glob(pattern)
+        if f.name != INSTRUCTIONS_FILE
+    )
 
-    txt_files = [f.name for f in PAPER_TXT_DIR.glob("*.txt")]
 
+@lru_cache(maxsize=64)
+def _render_parsed_papers_page(page: int, mtime_ns: int) -> str:
+    txt_files = _parsed_filenames(mtime_ns)
     if not txt_files:
         return "# Parsed Papers 📄\n\n_No parsed papers found._"
 
-    content = "# Parsed Papers 📄\n"
-    for filename in sorted(txt_files):
-        content += f"- {filename}\n"
+    total_pages = -(-len(txt_files) // PARSED_LIST_PAGE_SIZE)
+    page = min(page, total_pages)
+    start = (page - 1) * PARSED_LIST_PAGE_SIZE
+    lines = ["# Parsed Papers 📄"]
+    lines.extend(f"- {filename}" for filename in txt_files[start:start + PARSED_LIST_PAGE_SIZE])
+    if total_pages > 1:
+        lines.append("")
+        lines.append(_page_footer("papers://paper", page, total_pages))
+    return "\n".join(lines)
+
+
+def _list_parsed_papers_page(page: int) -> str:
+    if not PAPER_TXT_DIR.exists():
+        return "⚠️ Parsed directory not found."
+
+    return _render_parsed_papers_page(page, PAPER_TXT_DIR.stat().st_mtime_ns)
 
-    return content.strip()
+
+@mcp.resource("papers://paper")
+def list_parsed_papers() -> str:
+    """
+    Lists all parsed paper files from the parsed papers folder in markdown bullet list format.
+    Long lists are split into pages; use `papers://paper?page=N` for further pages.
+    """
+    return _list_parsed_papers_page(1)
 
 
 @mcp.resource("papers://folder")
 def get_available_folders() -> str:
     """
-    List all available topic folders in the parsed papers directory.
-    Each folder should contain a `papers_info.json` file.
+    List all available topic folders in the papers directory.
+    Each folder holds the `papers_info.json` data written by `search_papers`.
     """
-    folders = []
-
-    if PAPER_TXT_DIR.exists():
-        for topic_path in PAPER_TXT_DIR.iterdir():
-            if topic_path.is_dir() and (topic_path / "papers_info.json").exists():
-                folders.append(topic_path.name)
+    folders = sorted(get_paper_store().topics())
 
-    content = "# Available Topics (Parsed Directory)\n\n"
+    lines = ["# Available Topics", ""]
     if folders:
-        for folder in sorted(folders):
-            content += f"- {folder}\n"
-        content += "\nUse `@<folder>` to access papers in that topic.\n"
+        lines.extend(f"- {folder}" for folder in folders)
+        lines.append("")
+        lines.append("Use `@<folder>` to access papers in that topic.")
     else:
-        content += "_No topic folders with papers found._"
-
-    return content.strip()
+        lines.append("_No topic folders with papers found._")
+
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=32)
+def _load_topic(topic: str, version: tuple) -> List[tuple]:
+    # `version` is only part of the cache key: a write to the topic changes it
+    # and forces a fresh read.
+    return list(get_paper_store().read_topic(topic).items())
+
+
+@lru_cache(maxsize=256)
+def _render_topic_page(topic: str, page: int, version: tuple) -> str:
+    papers = _load_topic(topic, version)
+    total_pages = max(1, -(-len(papers) // TOPIC_PAGE_SIZE))
+    page = min(page, total_pages)
+    start = (page - 1) * TOPIC_PAGE_SIZE
+
+    parts = [f"# Papers in {topic}\n\nTotal papers: {len(papers)}\n"]
+    for paper_id, paper_info in papers[start:start + TOPIC_PAGE_SIZE]:
+        parts.append(
+            f"## {paper_info['title']}\n"
+            f"- **Paper ID**: {paper_id}\n"
+            f"- **Authors**: {', '.join(paper_info['authors'])}\n"
+            f"- **Published**: {paper_info['published']}\n"
+            f"- **PDF URL**: [{paper_info['pdf_url']}]({paper_info['pdf_url']})\n\n"
+            f"### Summary\n{paper_info['summary'][:500]}...\n\n"
+            "---\n"
+        )
+    if total_pages > 1:
+        parts.append(_page_footer(f"papers://{topic}", page, total_pages))
+    return "\n".join(parts).strip()
 
 
 @mcp.resource("papers://{topic}")
 def get_topic_from_parsed(topic: str) -> str:
+    """
+    Papers stored for a topic, one page at a time. Request further pages
+    with `papers://<topic>?page=N`.
+    """
+    topic, _, query = topic.partition("?")
+    page = _parse_page(query)
+    # `papers://paper?page=N` lands here because of the query string.
+    if topic == "paper":
+        return _list_parsed_papers_page(page)
+
     safe_topic = topic.lower().replace(" ", "_")
-    folder_path = PAPER_TXT_DIR / safe_topic
-    papers_file = folder_path / "papers_info.json"
+    store = get_paper_store()
 
-    if not papers_file.exists():
+    if not store.exists(safe_topic):
         return f"# No papers found for topic '{safe_topic}'.\n\nTry running `search_papers(topic='{safe_topic}')` first."
 
     try:
-        with open(papers_file, 'r', encoding='utf-8') as f:
-            papers_data = json.load(f)
+        return _render_topic_page(safe_topic, page, store.version(safe_topic))
     except json.JSONDecodeError:
         return f"# Error reading papers data for topic '{safe_topic}' — the file is corrupted."
 
-    content = f"# Papers in {safe_topic}\n\n"
-    content += f"Total papers: {len(papers_data)}\n\n"
 
-    for paper_id, paper_info in papers_data.items():
-        content += f"## {paper_info['title']}\n"
-        content += f"- **Paper ID**: {paper_id}\n"
-        content += f"- **Authors**: {', '.join(paper_info['authors'])}\n"
-        content += f"- **Published**: {paper_info['published']}\n"
-        content += f"- **PDF URL**: [{paper_info['pdf_url']}]({paper_info['pdf_url']})\n\n"
-        content += f"### Summary\n{paper_info['summary'][:500]}...\n\n"
-        content += "---\n\n"
+# -- Start the MCP server --
+def warm_caches() -> None:
+    """Open the shared stores and load arxiv and the docling models, so no session pays for it."""
+    get_arxiv_client()
+    get_paper_index()
+    get_conversion_cache()
+    get_fulltext_index()
+    get_vector_store()
+    get_search_cache()
+    parse_worker.get_converter()
+
+
+def start_prewarm() -> threading.Thread:
+    """
+    Run warm_caches on a daemon thread. A tool that needs a module still
+    being imported simply waits for the import to finish.
+    """
+    def prewarm():
+        with metrics.timer("prewarm_seconds"):
+            try:
+                warm_caches()
+            except Exception:
+                # Whatever failed will fail again, with its error reported, in the tool that needs it.
+                pass
 
-    return content.strip()
+    thread = threading.Thread(target=prewarm, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def prewarm_after_handshake() -> None:
+    """Call start_prewarm when the client's `initialized` notification arrives, ending the handshake."""
+    started = threading.Event()
+
+    async def on_initialized(notification: InitializedNotification) -> None:
+        if not started.is_set():
+            started.set()
+            start_prewarm()
+
+    mcp._mcp_server.notification_handlers[InitializedNotification] = on_initialized
+
+
+def start_topic_refresh(interval_hours: float) -> threading.Thread:
+    """Call refresh_topic for every stored topic every `interval_hours`, on a daemon thread."""
+    def refresh_loop():
+        while True:
+            time.sleep(interval_hours * 60 * 60)
+            try:
+                refresh_topics()
+            except Exception:
+                metrics.inc("topic_refresh_errors_total")
+
+    thread = threading.Thread(target=refresh_loop, name="topic-refresh", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    global MAX_CONCURRENT_TOOL_CALLS, MAX_QUEUED_TOOL_CALLS
+    parser = argparse.ArgumentParser(description="arXiv research MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"], default="stdio",
+                        help="stdio for one client per process, or an HTTP transport serving many sessions")
+    parser.add_argument("--host", default=DEFAULT_HTTP_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_HTTP_PORT)
+    parser.add_argument("--max-concurrent-calls", type=int, default=MAX_CONCURRENT_TOOL_CALLS)
+    parser.add_argument("--max-queued-calls", type=int, default=MAX_QUEUED_TOOL_CALLS)
+    parser.add_argument("--prewarm", action="store_true",
+                        help="in stdio mode, load heavy dependencies in the background after the handshake")
+    parser.add_argument("--refresh-every", type=float, metavar="HOURS",
+                        help="harvest new papers for every stored topic on this interval")
+    args = parser.parse_args()
+    MAX_CONCURRENT_TOOL_CALLS = args.max_concurrent_calls
+    MAX_QUEUED_TOOL_CALLS = args.max_queued_calls
+
+    if args.transport != "stdio":
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        path = mcp.settings.streamable_http_path if args.transport == "streamable-http" else mcp.settings.sse_path
+        print("Warming caches and document converter...")
+        warm_caches()
+        print(f"Serving research server on http://{args.host}:{args.port}{path}")
+    elif args.prewarm:
+        prewarm_after_handshake()
+    if args.refresh_every:
+        start_topic_refresh(args.refresh_every)
+
+    try:
+        mcp.run(transport=args.transport)
+    finally:
+        if METRICS_EXPORT_PATH:
+            metrics.export()
 
 
-# -- Start the MCP server --
 if __name__ == "__main__":
-    mcp.run(transport='stdio')
+    main()
 
 
 
@@ -0,0 +1,231 @@
+import asyncio
+import itertools
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from metrics import metrics
+
+# Lower numbers run first.
+DEFAULT_PRIORITY = 5
+# A waiting request moves up one priority level per this many seconds, so
+# low-priority work still runs under sustained high-priority load.
+PRIORITY_AGING_SECONDS = 30
+# Session names become log file names, so only plain names are accepted.
+SESSION_NAME_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class QueueFull(Exception):
+    pass
+
+
+def check_session_name(session: str) -> str:
+    if not isinstance(session, str) or not SESSION_NAME_RE.fullmatch(session):
+        raise ValueError(f"invalid session name {session!r}: use 1-64 letters, digits, '_' or '-'")
+    return session
+
+
+@dataclass
+class ScheduledRequest:
+    session: str
+    query: str
+    priority: int
+    seq: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+    def effective_priority(self, now: float, eligible_since: float) -> int:
+        # Whole levels, so requests of equal priority tie and fairness decides.
+        return self.priority - int((now - max(self.enqueued_at, eligible_since)) // PRIORITY_AGING_SECONDS)
+
+
+class RequestScheduler:
+    """
+    Runs chat requests from many sessions, at most `max_concurrent` at once.
+
+    Each session's requests run one at a time and in order, since they add to
+    the same conversation. Whenever a slot frees up, the next request comes
+    from the session whose oldest waiting request has the best priority
+    (lowest number, improved one level per PRIORITY_AGING_SECONDS it has
+    been next in line); ties go to the session that was served least
+    recently, so one busy session can't crowd out the others. Once
+    `max_queued` requests are waiting, `submit` raises QueueFull instead of
+    letting the queue grow without bound.
+    """
+
+    def __init__(self, handler: Callable[[str, str], Awaitable[str]], max_concurrent: int = 4, max_queued: int = 256):
+        self.handler = handler
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._queues: Dict[str, list] = {}
+        self._active: Set[str] = set()
+        self._last_served: Dict[str, float] = {}
+        self._waiting = 0
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("scheduler_queue_depth", self._waiting)
+        metrics.set_gauge("scheduler_active_requests", len(self._active))
+
+    def submit(self, session: str, query: str, priority: int = DEFAULT_PRIORITY) -> asyncio.Future:
+        """Queue a request; the future resolves to the answer text."""
+        check_session_name(session)
+        if self._waiting >= self.max_queued:
+            metrics.inc("scheduler_rejected_total")
+            raise QueueFull(f"{self._waiting} requests already waiting")
+        request = ScheduledRequest(session, query, priority, next(self._seq))
+        self._queues.setdefault(session, []).append(request)
+        self._waiting += 1
+        self._update_gauges()
+        self._wakeup.set()
+        return request.future
+
+    def _next_request(self) -> Optional[ScheduledRequest]:
+        now = time.monotonic()
+        candidates = [
+            (
+                queue[0].effective_priority(now, self._last_served.get(session, 0.0)),
+                self._last_served.get(session, 0.0),
+                queue[0].seq,
+                session,
+            )
+            for session, queue in self._queues.items()
+            if queue and session not in self._active
+        ]
+        if not candidates:
+            return None
+        session = min(candidates)[3]
+        request = self._queues[session].pop(0)
+        if not self._queues[session]:
+            del self._queues[session]
+        return request
+
+    async def _run(self, request: ScheduledRequest) -> None:
+        wait = time.monotonic() - request.enqueued_at
+        metrics.observe("scheduler_wait_seconds", wait, priority=request.priority)
+        try:
+            with metrics.timer("scheduler_request_seconds"):
+                answer = await self.handler(request.session, request.query)
+            if not request.future.done():
+                request.future.set_result(answer)
+        except Exception as e:
+            metrics.inc("scheduler_errors_total")
+            if not request.future.done():
+                request.future.set_exception(e)
+        finally:
+            self._active.discard(request.session)
+            self._last_served[request.session] = time.monotonic()
+            self._update_gauges()
+            self._wakeup.set()
+
+    async def run(self) -> None:
+        """Dispatch requests until cancelled."""
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while len(self._active) < self.max_concurrent:
+                    request = self._next_request()
+                    if request is None:
+                        break
+                    self._waiting -= 1
+                    self._active.add(request.session)
+                    self._update_gauges()
+                    task = asyncio.create_task(self._run(request))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+
+def _parse_request(record: Dict) -> Dict:
+    # Also accepts backlog-style records ({"request_id", "title", "body"}).
+    return {
+        "id": record.get("id", record.get("request_id")),
+        "session": str(record.get("session", "default")),
+        "query": record.get("query") or record.get("body") or "",
+        "priority": int(record.get("priority", DEFAULT_PRIORITY)),
+    }
+
+
+async def _answer(scheduler: RequestScheduler, request: Dict) -> Dict:
+    started = time.monotonic()
+    response = {"id": request["id"], "session": request["session"]}
+    try:
+        response["answer"] = await scheduler.submit(request["session"], request["query"], request["priority"])
+    except Exception as e:
+        response["error"] = str(e)
+    response["seconds"] = round(time.monotonic() - started, 3)
+    return response
+
+
+async def serve_jsonl_file(scheduler: RequestScheduler, requests_path, responses_path) -> int:
+    """
+    Run every request in a JSONL file (one `{"id", "session", "query",
+    "priority"}` object per line) and append one response line per request to
+    `responses_path` as each finishes. Returns the number of failed requests.
+    """
+    dispatcher = asyncio.create_task(scheduler.run())
+    try:
+        with open(requests_path, encoding="utf-8") as f:
+            requests = [_parse_request(json.loads(line)) for line in f if line.strip()]
+        # The file is all queued up front; it is bounded already.
+        scheduler.max_queued = max(scheduler.max_queued, len(requests))
+        failed = 0
+        with open(responses_path, "a", encoding="utf-8") as out:
+            # Tasks start in creation order, so each session's requests are queued in file order.
+            tasks = [asyncio.create_task(_answer(scheduler, request)) for request in requests]
+            for next_response in asyncio.as_completed(tasks):
+                response = await next_response
+                failed += "error" in response
+                out.write(json.dumps(response, ensure_ascii=False) + "\n")
+                out.flush()
+        return failed
+    finally:
+        dispatcher.cancel()
+
+
+async def serve_socket(scheduler: RequestScheduler, host: str, port: int) -> None:
+    """
+    Accept JSON-lines requests over TCP until cancelled. Each connection may
+    send any number of requests; responses are written back on the same
+    connection as they finish (match them up by `id`).
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        pending = set()
+
+        async def reply(request):
+            response = await _answer(scheduler, request)
+            writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+            await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    request = _parse_request(json.loads(line))
+                except (json.JSONDecodeError, ValueError, AttributeError) as e:
+                    writer.write((json.dumps({"error": f"invalid request: {e}"}) + "\n").encode("utf-8"))
+                    continue
+                task = asyncio.create_task(reply(request))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+    dispatcher = asyncio.create_task(scheduler.run())
+    server = await asyncio.start_server(handle, host, port)
+    print(f"📨 Accepting requests on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        dispatcher.cancel()
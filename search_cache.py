@@ -0,0 +1,114 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """
+    Persistent cache of arXiv search results keyed by (normalized query, pool size).
+    Each entry holds only the `top_k` results that were asked for, not the
+    whole pool; a later request for more than that is treated as a miss.
+
+    Entries younger than `ttl` are served as-is. Entries older than that but
+    within `stale_ttl` are still served immediately while a background thread
+    refreshes them (stale-while-revalidate). Anything older is fetched again
+    before returning.
+
+    `fetch(query, pool_size, top_k)` does the actual search and must return a
+    list of at most `top_k` JSON-serializable paper dicts, best first, so a
+    request for fewer can be served from the front of a larger entry. This
+    keeps the cache independent of the arXiv client and easy to drive with a
+    stub.
+    """
+
+    def __init__(self, db_path, fetch: Callable[[str, int, int], List[Dict]], ttl: float, stale_ttl: float):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS searches (
+                query TEXT NOT NULL,
+                pool_size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                results TEXT NOT NULL,
+                top_k INTEGER NOT NULL,
+                PRIMARY KEY (query, pool_size)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _store(self, query: str, pool_size: int, top_k: int, results: List[Dict]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (query, pool_size, fetched_at, results, top_k) VALUES (?, ?, ?, ?, ?)",
+                (query, pool_size, time.time(), json.dumps(results), top_k),
+            )
+            self._conn.commit()
+
+    def _refresh(self, query: str, pool_size: int, top_k: int) -> None:
+        try:
+            self._store(query, pool_size, top_k, self.fetch(query, pool_size, top_k))
+            with self._lock:
+                self.stats["refreshes"] += 1
+        except Exception:
+            with self._lock:
+                self.stats["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard((query, pool_size))
+
+    def _refresh_in_background(self, query: str, pool_size: int, top_k: int) -> None:
+        with self._lock:
+            if (query, pool_size) in self._refreshing:
+                return
+            self._refreshing.add((query, pool_size))
+        threading.Thread(target=self._refresh, args=(query, pool_size, top_k), daemon=True).start()
+
+    def get(self, query: str, pool_size: int, top_k: int) -> List[Dict]:
+        query = normalize_query(query)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, results, top_k FROM searches WHERE query = ? AND pool_size = ?",
+                (query, pool_size),
+            ).fetchone()
+
+        if row is not None and row[2] >= top_k:
+            fetched_at, results, stored_top_k = row
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                with self._lock:
+                    self.stats["hits"] += 1
+                return json.loads(results)[:top_k]
+            if age < self.stale_ttl:
+                with self._lock:
+                    self.stats["stale_hits"] += 1
+                self._refresh_in_background(query, pool_size, stored_top_k)
+                return json.loads(results)[:top_k]
+
+        with self._lock:
+            self.stats["misses"] += 1
+        results = self.fetch(query, pool_size, top_k)
+        self._store(query, pool_size, top_k, results)
+        return results
+
+    def clear(self) -> int:
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM searches").rowcount
+            self._conn.commit()
+        return removed
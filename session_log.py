@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from google.genai import types
+
+from chat_history import _to_jsonable
+from jsonl import iter_records, open_for_append
+
+
+class SessionLog:
+    """
+    Append-only JSONL log of a chat session, written as the conversation
+    happens so a crash or exit loses at most the turn in progress.
+
+    Each line is either a conversation message
+    (`{"ts", "content"}`, a serialized `types.Content`) or a result of a
+    cacheable tool (`{"ts", "tool", "args", "response", "ttl"}`), kept at
+    full size so it can be served from the tool cache again after a resume.
+    When history compaction drops old exchanges, `checkpoint` rewrites the
+    file with just the compacted messages and the still-fresh tool results,
+    so the log never grows much beyond what a resume needs.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def open(self, resume: bool) -> None:
+        """Start appending; without `resume` the previous session is discarded."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open_for_append(self.path) if resume else open(self.path, "w", encoding="utf-8")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if self._file is None:
+            return
+        line = json.dumps(record, default=_to_jsonable, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def append_message(self, content: types.Content) -> None:
+        self._write({"ts": time.time(), "content": _to_jsonable(content)})
+
+    def append_tool_result(self, tool: str, args: Dict[str, Any], response: Any, ttl: float) -> None:
+        self._write({"ts": time.time(), "tool": tool, "args": args, "response": response, "ttl": ttl})
+
+    def checkpoint(self, messages: List[types.Content]) -> None:
+        """Replace the log with `messages` plus the tool results that haven't expired."""
+        if self._file is None:
+            return
+        _, tool_results = self.load()
+        now = time.time()
+        tmp_path = self.path.with_suffix(".tmp")
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in tool_results:
+                    if record["ts"] + record["ttl"] > now:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                for content in messages:
+                    record = {"ts": now, "content": _to_jsonable(content)}
+                    f.write(json.dumps(record, default=_to_jsonable, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def load(self) -> Tuple[List[types.Content], List[Dict[str, Any]]]:
+        """(messages, tool result records) stored in the log; empty if there is none."""
+        messages = []
+        tool_results = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for record in iter_records(f):
+                    if "content" in record:
+                        messages.append(types.Content.model_validate(record["content"]))
+                    elif "tool" in record:
+                        tool_results.append(record)
+        except FileNotFoundError:
+            pass
+        return messages, tool_results
@@ -0,0 +1,22 @@
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from import_time import probe
+
+BUDGET_MS = 1000
+RUNS = 3
+
+
+def test_research_server_imports_within_budget():
+    timings = []
+    loaded = set()
+    for _ in range(RUNS):
+        result, _ = probe()
+        timings.append(result["seconds"] * 1000)
+        loaded.update(result["loaded"])
+
+    assert not loaded, f"loaded at import time but should be lazy: {', '.join(sorted(loaded))}"
+    assert statistics.median(timings) < BUDGET_MS
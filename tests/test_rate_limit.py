@@ -0,0 +1,94 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rate_limit import TokenBucket, call_with_retries, is_retryable
+
+
+class StatusError(Exception):
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+def test_token_bucket_allows_burst_then_paces_at_rate():
+    async def scenario():
+        bucket = TokenBucket(rate=20, capacity=2)
+        started = time.monotonic()
+        for _ in range(2):
+            await bucket.acquire()
+        burst = time.monotonic() - started
+        for _ in range(4):
+            await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(scenario())
+    assert burst < 0.05
+    # Four more tokens at 20 per second.
+    assert 0.18 <= total < 0.4
+
+
+def test_token_bucket_serves_waiters_in_arrival_order():
+    async def scenario():
+        bucket = TokenBucket(rate=50, capacity=1)
+        order = []
+
+        async def take(name):
+            await bucket.acquire()
+            order.append(name)
+
+        await asyncio.gather(*[take(i) for i in range(5)])
+        return order
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (StatusError(429), True),
+    (StatusError(503), True),
+    (StatusError(400), False),
+    (TimeoutError(), True),
+    (ValueError(), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def call_failing(errors, **kwargs):
+    """Run call_with_retries over a call that raises `errors` in turn, then succeeds."""
+    attempts = []
+
+    async def call():
+        attempts.append(len(attempts))
+        if len(attempts) <= len(errors):
+            raise errors[len(attempts) - 1]
+        return "ok"
+
+    async def scenario():
+        return await call_with_retries(call, None, retries=kwargs.pop("retries", 3), base=0, cap=0, name="test", **kwargs)
+
+    return asyncio.run(scenario()), len(attempts)
+
+
+def test_retryable_errors_are_retried():
+    assert call_failing([StatusError(429), TimeoutError()]) == ("ok", 3)
+
+
+def test_gives_up_after_the_last_retry():
+    with pytest.raises(StatusError):
+        call_failing([StatusError(503)] * 3, retries=2)
+
+
+def test_non_retryable_error_is_raised_at_once():
+    with pytest.raises(StatusError):
+        call_failing([StatusError(400)])
+
+
+def test_can_retry_vetoes_retrying():
+    with pytest.raises(StatusError):
+        call_failing([StatusError(429)], can_retry=lambda: False)
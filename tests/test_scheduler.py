@@ -0,0 +1,121 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scheduler import PRIORITY_AGING_SECONDS, QueueFull, RequestScheduler, ScheduledRequest
+
+
+def run_requests(requests, max_concurrent=1):
+    """
+    Queue `requests` ((session, query, priority) tuples) while the first one
+    holds the only slot, then let everything run; returns queries in the
+    order the handler started them.
+    """
+    async def scenario():
+        started = []
+        release = asyncio.Event()
+
+        async def handler(session, query):
+            started.append(query)
+            if len(started) == 1:
+                await release.wait()
+            return query
+
+        sched = RequestScheduler(handler, max_concurrent=max_concurrent)
+        dispatcher = asyncio.create_task(sched.run())
+        futures = [sched.submit(*requests[0])]
+        await asyncio.sleep(0)
+        futures += [sched.submit(*request) for request in requests[1:]]
+        release.set()
+        answers = await asyncio.gather(*futures)
+        dispatcher.cancel()
+        assert answers == [request[1] for request in requests]
+        return started
+
+    return asyncio.run(scenario())
+
+
+def test_lower_priority_number_runs_first():
+    order = run_requests([("a", "first", 5), ("b", "low", 9), ("c", "high", 1), ("d", "mid", 5)])
+    assert order == ["first", "high", "mid", "low"]
+
+
+def test_session_requests_run_in_order():
+    order = run_requests([("a", "a1", 5), ("b", "b1", 5), ("b", "b2", 1), ("b", "b3", 1)])
+    assert order == ["a1", "b1", "b2", "b3"]
+
+
+def test_ties_go_to_least_recently_served_session():
+    order = run_requests([("a", "a1", 5), ("a", "a2", 5), ("a", "a3", 5), ("b", "b1", 5), ("b", "b2", 5)])
+    assert order == ["a1", "b1", "a2", "b2", "a3"]
+
+
+def test_one_request_per_session_at_a_time():
+    async def scenario():
+        running = {}
+        overlaps = []
+
+        async def handler(session, query):
+            running[session] = running.get(session, 0) + 1
+            overlaps.append(running[session])
+            await asyncio.sleep(0.01)
+            running[session] -= 1
+            return query
+
+        sched = RequestScheduler(handler, max_concurrent=4)
+        dispatcher = asyncio.create_task(sched.run())
+        await asyncio.gather(*[sched.submit("a", str(i)) for i in range(5)])
+        dispatcher.cancel()
+        return overlaps
+
+    assert max(asyncio.run(scenario())) == 1
+
+
+def test_waiting_request_ages_one_level_per_interval():
+    async def scenario():
+        request = ScheduledRequest("a", "q", priority=5, seq=0, enqueued_at=100.0)
+        return [
+            request.effective_priority(100.0 + PRIORITY_AGING_SECONDS - 1, 0.0),
+            request.effective_priority(100.0 + 2 * PRIORITY_AGING_SECONDS, 0.0),
+            # Aging only counts from when the session's previous request finished.
+            request.effective_priority(100.0 + 2 * PRIORITY_AGING_SECONDS, 100.0 + PRIORITY_AGING_SECONDS),
+        ]
+
+    assert asyncio.run(scenario()) == [5, 3, 4]
+
+
+def test_aged_request_overtakes_newer_high_priority():
+    async def scenario():
+        sched = RequestScheduler(lambda session, query: None)
+        sched.submit("old", "old", priority=5)
+        sched.submit("new", "new", priority=3)
+        # As if "old" had been waiting for three aging intervals.
+        sched._queues["old"][0].enqueued_at -= 3 * PRIORITY_AGING_SECONDS
+        return sched._next_request().query
+
+    assert asyncio.run(scenario()) == "old"
+
+
+def test_submit_rejects_when_queue_is_full():
+    async def scenario():
+        sched = RequestScheduler(lambda session, query: None, max_queued=2)
+        sched.submit("a", "1")
+        sched.submit("b", "2")
+        with pytest.raises(QueueFull):
+            sched.submit("c", "3")
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("session", ["../../x", "/tmp/evil", "", "a" * 65, "a b"])
+def test_submit_rejects_unsafe_session_names(session):
+    async def scenario():
+        sched = RequestScheduler(lambda session, query: None)
+        with pytest.raises(ValueError):
+            sched.submit(session, "q")
+
+    asyncio.run(scenario())
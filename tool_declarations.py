@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+
+def tools_fingerprint(tools: Iterable[Any]) -> str:
+    """Hash of a server's tool list (names, descriptions and input schemas)."""
+    payload = [
+        {"name": tool.name, "description": tool.description, "inputSchema": tool.inputSchema}
+        for tool in tools
+    ]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class DeclarationCache:
+    """
+    On-disk cache of Gemini-ready function declarations per server, stored
+    as plain dicts (name, description, cleaned parameters) and keyed by the
+    fingerprint of the server's tool list. A server whose tools haven't
+    changed skips schema cleaning entirely.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._dirty = False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+
+    def get(self, server: str, fingerprint: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(server)
+        if entry and entry.get("fingerprint") == fingerprint:
+            return entry["declarations"]
+        return None
+
+    def put(self, server: str, fingerprint: str, declarations: List[Dict[str, Any]]) -> None:
+        self._entries[server] = {"fingerprint": fingerprint, "declarations": declarations}
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+# Common English words that appear in nearly every tool description and query.
+STOPWORDS = frozenset("""
+    about above after again all also and any are because been before being
+    but can could did does doing down each few for from further had has have
+    having her here hers him his how into its just latest let like more most
+    new not now off once only other our out over own please same she should
+    some such than that the their them then there these they this those
+    through too under until use used using very via was way were what when
+    where which while who whom why will with would you your
+""".split())
+
+
+def _words(text: str) -> Set[str]:
+    return {
+        word for word in re.findall(r"[a-z0-9]+", text.lower())
+        if len(word) > 2 and word not in STOPWORDS
+    }
+
+
+def select_servers(query: str, server_texts: Dict[str, str], always: Iterable[str] = ()) -> Set[str]:
+    """
+    Pick the servers whose tool names/descriptions share distinctive words
+    with the query, plus `always`. Stopwords and words found in every
+    server's text are ignored, since they can't tell servers apart. Falls
+    back to every server when nothing matches, so a vague query never
+    leaves the model without tools.
+    """
+    query_words = _words(query)
+    server_words = {name: _words(text) for name, text in server_texts.items()}
+    if len(server_words) > 1:
+        shared = set.intersection(*server_words.values())
+        server_words = {name: words - shared for name, words in server_words.items()}
+    selected = {name for name, words in server_words.items() if query_words & words}
+    selected.update(name for name in always if name in server_texts)
+    return selected or set(server_texts)
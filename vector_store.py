@@ -0,0 +1,279 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import uuid
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+# An embedding function maps a batch of texts to a (len(texts), dim) float array.
+EmbedFn = Callable[[Sequence[str]], np.ndarray]
+# Deleted rows are compacted away once there are at least this many and they
+# outnumber the live ones.
+COMPACT_MIN_DELETED = 1024
+
+
+class HashingEmbedder:
+    """
+    Dependency-free local embedder: signed feature hashing of word unigrams and
+    bigrams. It captures lexical overlap rather than meaning, but needs no
+    model download; swap in a real model with `sentence_transformer_embedder`.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                # crc32 rather than hash(): it must be stable across processes.
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return np.sign(vectors) * np.log1p(np.abs(vectors))
+
+
+def sentence_transformer_embedder(model_name: str) -> EmbedFn:
+    """Embedder backed by a local sentence-transformers model (optional dependency)."""
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+    embed = lambda texts: model.encode(list(texts), batch_size=64, convert_to_numpy=True)
+    embed.dim = model.get_sentence_embedding_dimension()
+    return embed
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorStore:
+    """
+    Append-only store of unit-length float32 vectors in a raw memory-mapped
+    file (`vectors.f32`, one row per chunk), with chunk metadata in SQLite.
+
+    Row i of the matrix belongs to chunk id i. Re-indexing a paper marks its
+    old chunks as deleted and appends new rows, so adding papers never
+    rewrites existing vectors; a paper whose text hasn't changed is skipped.
+    Once deleted rows outnumber live ones, `compact` writes the live rows to
+    a new file and renumbers them. Search is a batched matrix-vector product
+    (cosine similarity, since rows are normalized) with a top-k partition
+    per batch.
+    """
+
+    def __init__(self, store_dir, embed: EmbedFn, dim: int, batch_rows: int = 65536):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.embed = embed
+        self.dim = dim
+        self.batch_rows = batch_rows
+        db_path = self.store_dir / "chunks.db"
+        self.is_new = not db_path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                paper_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                title TEXT NOT NULL,
+                text TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_paper ON chunks (paper_id, kind)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS indexed (
+                paper_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                PRIMARY KEY (paper_id, kind)
+            )
+            """
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        if row is None:
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+        elif int(row[0]) != dim:
+            raise ValueError(
+                f"Vector store at {self.store_dir} holds {row[0]}-dim vectors but the embedder produces {dim}; "
+                "delete the store to re-embed with the new model."
+            )
+        # Compaction writes a new vectors file and switches to it in the same
+        # transaction that renumbers the chunks, so a crash leaves either the
+        # old file and ids or the new ones.
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'vectors_file'").fetchone()
+        self._vectors_path = self.store_dir / (row[0] if row else "vectors.f32")
+        for stale in self.store_dir.glob("vectors*.f32"):
+            if stale != self._vectors_path:
+                stale.unlink(missing_ok=True)
+        self._conn.commit()
+        self._deleted = self._conn.execute("SELECT COUNT(*) FROM chunks WHERE deleted = 1").fetchone()[0]
+        self._generation = 0
+        self._matrix = None
+        self._live = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def _count(self) -> int:
+        # The metadata table is authoritative: vectors appended without a
+        # committed row (crash mid-add) are ignored and later overwritten.
+        return self._conn.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM chunks").fetchone()[0]
+
+    def add(self, paper_id: str, kind: str, title: str, texts: List[str]) -> int:
+        """
+        Replace the chunks of (paper_id, kind) with `texts`. Returns the number
+        of chunks added, 0 if they are the same as the stored ones.
+        """
+        text_hash = hashlib.sha256("\0".join([title, *texts]).encode("utf-8")).hexdigest()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text_hash FROM indexed WHERE paper_id = ? AND kind = ?", (paper_id, kind)
+            ).fetchone()
+        if row is not None and row[0] == text_hash:
+            return 0
+
+        vectors = _normalize(self.embed(texts)) if texts else np.zeros((0, self.dim), dtype=np.float32)
+        with self._lock:
+            self._deleted += self._conn.execute(
+                "UPDATE chunks SET deleted = 1 WHERE paper_id = ? AND kind = ? AND deleted = 0", (paper_id, kind)
+            ).rowcount
+            start = self._count()
+            # Drop our mapping before resizing the file (required on Windows).
+            self._matrix = None
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(start * self.dim * 4)
+                f.write(vectors.tobytes())
+            self._conn.executemany(
+                "INSERT INTO chunks (id, paper_id, kind, title, text) VALUES (?, ?, ?, ?, ?)",
+                [(start + i, paper_id, kind, title, text) for i, text in enumerate(texts)],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed (paper_id, kind, text_hash) VALUES (?, ?, ?)",
+                (paper_id, kind, text_hash),
+            )
+            self._conn.commit()
+            if self._deleted >= COMPACT_MIN_DELETED and self._deleted > start + len(texts) - self._deleted:
+                self._compact()
+        return len(texts)
+
+    def compact(self) -> None:
+        """Drop deleted rows from the vectors file, renumbering the live chunks."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        # Caller holds the lock.
+        live_ids = [row[0] for row in self._conn.execute("SELECT id FROM chunks WHERE deleted = 0 ORDER BY id")]
+        count = self._count()
+        old_path = self._vectors_path
+        new_path = self.store_dir / f"vectors.{uuid.uuid4().hex[:12]}.f32"
+        self._matrix = None
+        if count:
+            matrix = np.memmap(old_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+            with open(new_path, "wb") as f:
+                for start in range(0, len(live_ids), self.batch_rows):
+                    f.write(np.asarray(matrix[live_ids[start:start + self.batch_rows]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            del matrix
+        else:
+            new_path.touch()
+        self._conn.execute("DELETE FROM chunks WHERE deleted = 1")
+        # Ids only move down, in order, so no update collides with a row not yet moved.
+        self._conn.executemany(
+            "UPDATE chunks SET id = ? WHERE id = ?",
+            [(new_id, old_id) for new_id, old_id in enumerate(live_ids) if new_id != old_id],
+        )
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('vectors_file', ?)", (new_path.name,))
+        self._conn.commit()
+        self._vectors_path = new_path
+        self._deleted = 0
+        self._generation += 1
+        try:
+            old_path.unlink(missing_ok=True)
+        except OSError:
+            # Still mapped by a search on Windows; removed when the store is next opened.
+            pass
+
+    def _load(self):
+        # Caller holds the lock.
+        if self._matrix is None:
+            count = self._count()
+            if count:
+                self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+            else:
+                self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+            self._live = np.ones(count, dtype=bool)
+            deleted = [row[0] for row in self._conn.execute("SELECT id FROM chunks WHERE deleted = 1")]
+            self._live[deleted] = False
+        return self._matrix, self._live
+
+    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        query_vector = _normalize(self.embed([query]))[0]
+        while True:
+            with self._lock:
+                matrix, live = self._load()
+                generation = self._generation
+            ids, scores = top_k_cosine(matrix, live, query_vector, limit, self.batch_rows)
+            if not len(ids):
+                return []
+
+            with self._lock:
+                if self._generation != generation:
+                    # Compacted while scanning; the ids now point at other chunks.
+                    continue
+                placeholders = ",".join("?" * len(ids))
+                rows = {
+                    row[0]: row[1:]
+                    for row in self._conn.execute(
+                        f"SELECT id, paper_id, kind, title, text FROM chunks WHERE id IN ({placeholders})",
+                        [int(i) for i in ids],
+                    )
+                }
+            break
+        return [
+            {"paper_id": rows[i][0], "kind": rows[i][1], "title": rows[i][2], "text": rows[i][3], "score": float(score)}
+            for i, score in zip(ids.tolist(), scores)
+            if i in rows
+        ]
+
+
+def top_k_cosine(matrix: np.ndarray, live: np.ndarray, query_vector: np.ndarray, k: int, batch_rows: int):
+    """Top-k rows of `matrix @ query_vector` among `live` rows, scanning in batches."""
+    candidate_ids = []
+    candidate_scores = []
+    for start in range(0, matrix.shape[0], batch_rows):
+        scores = np.asarray(matrix[start:start + batch_rows]) @ query_vector
+        scores[~live[start:start + batch_rows]] = -np.inf
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        candidate_ids.append(top + start)
+        candidate_scores.append(scores[top])
+
+    if not candidate_ids:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    ids = np.concatenate(candidate_ids)
+    scores = np.concatenate(candidate_scores)
+    keep = np.isfinite(scores)
+    ids, scores = ids[keep], scores[keep]
+    order = np.argsort(-scores)[:k]
+    return ids[order], scores[order]